@@ -0,0 +1,34 @@
+
+#==============================================================================
+# Requirements
+#==============================================================================
+
+# Standard libs ---------------------------------------------------------------
+
+# Third party libs ------------------------------------------------------------
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Project modules -------------------------------------------------------------
+
+import allay
+from .src.admin import *
+
+#==============================================================================
+# Plugin
+#==============================================================================
+
+# Info ------------------------------------------------------------------------
+
+VERSION = "0.0.1"
+ICON = "🛠️"
+NAME = "Admin"
+
+# Cog -------------------------------------------------------------------------
+
+async def setup(bot: allay.Bot):
+    "Load cogs related to the bot administration"
+    logger.info(f"Loading {ICON} {NAME} v{VERSION}...")
+    await bot.add_cog(Admin(bot), icon=ICON, display_name=NAME)
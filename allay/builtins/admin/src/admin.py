@@ -0,0 +1,86 @@
+"""
+Ce programme est régi par la licence CeCILL soumise au droit français et
+respectant les principes de diffusion des logiciels libres. Vous pouvez
+utiliser, modifier et/ou redistribuer ce programme sous les conditions
+de la licence CeCILL diffusée sur le site "http://www.cecill.info".
+"""
+
+#==============================================================================
+# Requirements
+#==============================================================================
+
+# Standard libs ---------------------------------------------------------------
+
+from typing import Literal
+
+# Third party libs ------------------------------------------------------------
+
+from discord.ext import commands
+
+# Project modules -------------------------------------------------------------
+
+import allay
+from allay.core.src.query_stats import QueryStats
+
+#==============================================================================
+# Checks
+#==============================================================================
+
+def is_bot_admin(ctx: allay.Context) -> bool:
+    "Check if the author of a command is one of the bot admins"
+    return ctx.author.id in allay.BotConfig.get("core.admins")
+
+#==============================================================================
+# Plugin
+#==============================================================================
+
+class Admin(commands.Cog):
+    "Commands reserved to the bot admins"
+
+    def __init__(self, bot: allay.Bot):
+        self.bot = bot
+        self.file = "admin"
+
+    async def cog_check(self, ctx: allay.Context) -> bool: # type: ignore
+        return is_bot_admin(ctx)
+
+    @commands.group(name="admin", hidden=True)
+    async def main_admin(self, ctx: allay.Context):
+        """Bot administration commands"""
+        if ctx.invoked_subcommand is None:
+            await ctx.send_help(ctx.command)
+
+    @main_admin.command(name="dbstats")
+    async def dbstats(self, ctx: allay.Context,
+                      sort: Literal["total", "calls", "p99", "rows"] = "total", limit: int = 10):
+        """Show the database statements that cost the most"""
+        stats = QueryStats.top(limit, sort)
+        if not stats:
+            await ctx.send(allay.I18N.tr(ctx, "admin.dbstats.empty"))
+            return
+
+        text = f"{'calls':>7} {'total ms':>9} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} " \
+            f"{'rows':>8}  statement\n"
+        for stat in stats:
+            statement = stat.statement if len(stat.statement) <= 60 else \
+                stat.statement[:59] + "…"
+            line = (
+                f"{stat.calls:>7} {stat.total_time * 1000:>9.1f} "
+                f"{stat.percentile(50) * 1000:>7.2f} {stat.percentile(95) * 1000:>7.2f} "
+                f"{stat.percentile(99) * 1000:>7.2f} {stat.rows:>8}  {statement}\n"
+            )
+            # keep the message under the Discord limit
+            if len(text) + len(line) > 1900:
+                break
+            text += line
+        await ctx.send(allay.I18N.tr(ctx, "admin.dbstats.title", sort=sort) + f"\n```\n{text}```")
+
+    @main_admin.command(name="reloadlangs")
+    async def reloadlangs(self, ctx: allay.Context):
+        """Reload the lang files edited since the bot started"""
+        if changed := allay.I18N.reload():
+            files = "\n".join(f"- {path}" for path in changed)
+            await ctx.send(allay.I18N.tr(ctx, "admin.reloadlangs.done", count=len(changed))
+                           + f"\n```\n{files}```")
+        else:
+            await ctx.send(allay.I18N.tr(ctx, "admin.reloadlangs.none"))
@@ -14,7 +14,14 @@ logger = logging.getLogger(__name__)
 # Project modules -------------------------------------------------------------
 
 import allay
+from .src.config_events import ConfigChange, ConfigEventBus
 from .src.config_manager import *
+from .src.config_options import CompiledOption, InvalidOptionValue
+from .src.config_codecs import CODECS, ConfigCodec, JsonCodec, MsgpackCodec, OrjsonCodec, get_codec
+from .src.config_storage import (
+    ConfigStorage, FileConfigStorage, JsonConfigStorage, SqliteConfigStorage
+)
+from .src.option_registry import OptionRegistry
 from .src.sconfig import *
 
 #==============================================================================
@@ -0,0 +1,6 @@
+CREATE TABLE IF NOT EXISTS server_configs (
+    guild_id INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (guild_id, key)
+) WITHOUT ROWID;
@@ -0,0 +1,120 @@
+"""
+Ce programme est régi par la licence CeCILL soumise au droit français et
+respectant les principes de diffusion des logiciels libres. Vous pouvez
+utiliser, modifier et/ou redistribuer ce programme sous les conditions
+de la licence CeCILL diffusée sur le site "http://www.cecill.info".
+"""
+
+#==============================================================================
+# Requirements
+#==============================================================================
+
+# Standard libs ---------------------------------------------------------------
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Optional, TypeVar
+
+#==============================================================================
+# Cache
+#==============================================================================
+
+T = TypeVar("T")
+
+def estimate_size(value: Any) -> int:
+    "Estimate the memory used by a JSON-like value, in bytes"
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(estimate_size(v) for v in value)
+    return size
+
+
+class ConfigCache(Generic[T]):
+    """Least recently used cache of guild configurations
+
+    The cache can be bounded by a number of entries and/or an estimated memory size, and its
+    entries can expire after some time. A limit of 0 disables it"""
+
+    def __init__(self, max_entries: int = 0, max_bytes: int = 0, ttl: float = 0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0 # estimated memory used by the cached values, in bytes
+        # guild_id -> (value, estimated size, expiration time)
+        self._entries: OrderedDict[int, tuple[T, int, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<ConfigCache entries={len(self)} size={self.size} hits={self.hits} " \
+            f"misses={self.misses} evictions={self.evictions}>"
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, guild_id: int):
+        with self._lock:
+            entry = self._entries.get(guild_id)
+            return entry is not None and not self._expired(entry)
+
+    def get(self, guild_id: int) -> Optional[T]:
+        "Get a cached value and mark it as recently used, or None if it isn't cached"
+        with self._lock:
+            entry = self._entries.get(guild_id)
+            if entry is None or self._expired(entry):
+                if entry is not None:
+                    self._remove(guild_id)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(guild_id)
+            self.hits += 1
+            return entry[0]
+
+    def __setitem__(self, guild_id: int, value: T):
+        size = estimate_size(value)
+        expiration = time.monotonic() + self.ttl if self.ttl > 0 else 0
+        with self._lock:
+            if guild_id in self._entries:
+                self._remove(guild_id)
+            self._entries[guild_id] = (value, size, expiration)
+            self.size += size
+            # evict the least recently used entries, but always keep the new one
+            while len(self._entries) > 1 and (
+                (self.max_entries > 0 and len(self._entries) > self.max_entries)
+                or (self.max_bytes > 0 and self.size > self.max_bytes)
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def __delitem__(self, guild_id: int):
+        with self._lock:
+            if guild_id in self._entries:
+                self._remove(guild_id)
+
+    def items(self) -> list[tuple[int, T]]:
+        "List the cached (guild_id, value), without marking them as recently used"
+        with self._lock:
+            return [
+                (guild_id, entry[0]) for guild_id, entry in self._entries.items()
+                if not self._expired(entry)
+            ]
+
+    def clear(self):
+        "Remove every cached value"
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _expired(self, entry: tuple[T, int, float]) -> bool:
+        return entry[2] != 0 and entry[2] < time.monotonic()
+
+    def _remove(self, guild_id: int):
+        "Remove an entry. The caller must hold the lock"
+        _, size, _ = self._entries.pop(guild_id)
+        self.size -= size
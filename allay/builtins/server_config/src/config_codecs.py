@@ -0,0 +1,119 @@
+"""
+Ce programme est régi par la licence CeCILL soumise au droit français et
+respectant les principes de diffusion des logiciels libres. Vous pouvez
+utiliser, modifier et/ou redistribuer ce programme sous les conditions
+de la licence CeCILL diffusée sur le site "http://www.cecill.info".
+"""
+
+#==============================================================================
+# Requirements
+#==============================================================================
+
+# Standard libs ---------------------------------------------------------------
+
+import json
+import logging
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+#==============================================================================
+# Codecs
+#==============================================================================
+
+class ConfigCodec:
+    "Serialize the guild configuration files"
+
+    name = ""
+    # Files written with codecs sharing an extension can be read by each other
+    extension = ""
+
+    def dumps(self, config: dict[str, Any]) -> bytes:
+        "Serialize a guild configuration"
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> dict[str, Any]:
+        "Deserialize a guild configuration"
+        raise NotImplementedError
+
+
+class JsonCodec(ConfigCodec):
+    "Standard library JSON"
+
+    name = "json"
+    extension = ".json"
+
+    def dumps(self, config: dict[str, Any]) -> bytes:
+        return json.dumps(config, separators=(",", ":")).encode()
+
+    def loads(self, data: bytes) -> dict[str, Any]:
+        return json.loads(data)
+
+
+class OrjsonCodec(ConfigCodec):
+    "JSON, using the faster orjson library (optional dependency)"
+
+    name = "orjson"
+    extension = ".json"
+
+    def __init__(self):
+        import orjson # pylint: disable=import-outside-toplevel,import-error
+        self._orjson = orjson
+
+    def dumps(self, config: dict[str, Any]) -> bytes:
+        return self._orjson.dumps(config) # pylint: disable=no-member
+
+    def loads(self, data: bytes) -> dict[str, Any]:
+        return self._orjson.loads(data) # pylint: disable=no-member
+
+
+class MsgpackCodec(ConfigCodec):
+    "MessagePack binary format, using the msgpack library (optional dependency)"
+
+    name = "msgpack"
+    extension = ".msgpack"
+
+    def __init__(self):
+        import msgpack # pylint: disable=import-outside-toplevel,import-error
+        self._msgpack = msgpack
+
+    def dumps(self, config: dict[str, Any]) -> bytes:
+        return self._msgpack.packb(config)
+
+    def loads(self, data: bytes) -> dict[str, Any]:
+        return self._msgpack.unpackb(data)
+
+
+CODECS: dict[str, type[ConfigCodec]] = {
+    codec.name: codec for codec in (JsonCodec, OrjsonCodec, MsgpackCodec)
+}
+
+EXTENSIONS = {codec.extension for codec in CODECS.values()}
+
+def get_codec(name: str) -> ConfigCodec:
+    """Create a codec from its name
+    If its library isn't installed, the standard JSON codec is used instead
+
+    :raises ValueError: If the codec is unknown
+    """
+    if name not in CODECS:
+        raise ValueError(f"Unknown server configs codec: {name}")
+    try:
+        return CODECS[name]()
+    except ImportError:
+        logger.warning("The %s library is not installed, using the json codec instead", name)
+        return JsonCodec()
+
+def get_reader(extension: str) -> ConfigCodec:
+    """Create the fastest available codec able to read files with the given extension
+
+    :raises ImportError: If the library needed to read these files isn't installed
+    """
+    readers = [codec for codec in CODECS.values() if codec.extension == extension]
+    for codec in reversed(readers):
+        try:
+            return codec()
+        except ImportError:
+            if codec is readers[0]:
+                raise
+    raise ValueError(f"Unknown server configs extension: {extension}")
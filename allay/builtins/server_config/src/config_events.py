@@ -0,0 +1,131 @@
+"""
+Ce programme est régi par la licence CeCILL soumise au droit français et
+respectant les principes de diffusion des logiciels libres. Vous pouvez
+utiliser, modifier et/ou redistribuer ce programme sous les conditions
+de la licence CeCILL diffusée sur le site "http://www.cecill.info".
+"""
+
+#==============================================================================
+# Requirements
+#==============================================================================
+
+# Standard libs ---------------------------------------------------------------
+
+import asyncio
+import inspect
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Iterable, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+#==============================================================================
+# Events
+#==============================================================================
+
+class ConfigChange(NamedTuple):
+    "A guild option whose value changed. Values include the template defaults"
+    guild_id: int
+    key: str
+    old: Any
+    new: Any
+
+ConfigListener = Callable[[list[ConfigChange]], Optional[Awaitable[Any]]]
+
+
+class ConfigEventBus:
+    """Dispatch the guild configuration changes to the subscribed listeners
+
+    Changes published during the same event loop iteration are dispatched together, once per
+    listener, on the next iteration. Several changes of the same option in a batch are merged
+    into a single one. Listeners can be functions or coroutine functions"""
+
+    def __init__(self):
+        # option key (or None for every option) -> listeners
+        self._listeners: dict[Optional[str], list[ConfigListener]] = {}
+        # (guild_id, key) -> change, waiting to be dispatched
+        self._pending: dict[tuple[int, str], ConfigChange] = {}
+        self._scheduled = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def has_listeners(self) -> bool:
+        "Check if at least one listener is subscribed"
+        return bool(self._listeners)
+
+    def subscribe(self, listener: ConfigListener, *keys: str):
+        """Call a listener with the batches of changes of some options
+
+        :param listener: Called with the list of changes of the subscribed options
+        :param keys: The options to listen to. Every option if none is given
+        """
+        with self._lock:
+            for key in keys or (None,):
+                listeners = self._listeners.setdefault(key, [])
+                if listener not in listeners:
+                    listeners.append(listener)
+
+    def unsubscribe(self, listener: ConfigListener):
+        "Stop calling a listener"
+        with self._lock:
+            for key, listeners in list(self._listeners.items()):
+                if listener in listeners:
+                    listeners.remove(listener)
+                if not listeners:
+                    del self._listeners[key]
+
+    def publish(self, changes: Iterable[ConfigChange]):
+        "Queue some changes, to be dispatched on the next event loop iteration"
+        with self._lock:
+            for change in changes:
+                previous = self._pending.get((change.guild_id, change.key))
+                if previous is not None:
+                    change = change._replace(old=previous.old)
+                self._pending[(change.guild_id, change.key)] = change
+            if self._scheduled or not self._pending:
+                return
+            self._scheduled = True
+        try:
+            self._loop = asyncio.get_running_loop()
+            self._loop.call_soon(self.dispatch)
+        except RuntimeError:
+            # published from another thread, or without any running loop
+            if self._loop is not None and self._loop.is_running():
+                self._loop.call_soon_threadsafe(self.dispatch)
+            else:
+                self.dispatch()
+
+    def dispatch(self):
+        "Call the listeners with the pending changes"
+        with self._lock:
+            changes = [
+                change for change in self._pending.values() if change.old != change.new
+            ]
+            self._pending = {}
+            self._scheduled = False
+            listeners = {key: list(values) for key, values in self._listeners.items()}
+        batches: dict[ConfigListener, list[ConfigChange]] = {}
+        for change in changes:
+            for key in (None, change.key):
+                for listener in listeners.get(key, ()):
+                    batches.setdefault(listener, []).append(change)
+        for listener, batch in batches.items():
+            try:
+                result = listener(batch)
+                if inspect.isawaitable(result):
+                    self._run_coroutine(result)
+            except Exception: # pylint: disable=broad-except
+                logger.exception("Error in the config change listener %r", listener)
+
+    def _run_coroutine(self, coroutine: Awaitable[Any]):
+        "Run a coroutine listener in background, logging its errors"
+        async def runner():
+            try:
+                await coroutine
+            except Exception: # pylint: disable=broad-except
+                logger.exception("Error in a config change listener")
+        try:
+            asyncio.get_running_loop().create_task(runner())
+        except RuntimeError:
+            asyncio.run(runner())
@@ -11,9 +11,13 @@ de la licence CeCILL diffusée sur le site "http://www.cecill.info".
 
 # Standard libs ---------------------------------------------------------------
 
-import os
-from json import dump, load
-from typing import Any, Literal, Optional, TypedDict
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from collections.abc import Mapping
+from typing import Any, Iterable, Literal, Optional, TypedDict
 
 # Third party libs ------------------------------------------------------------
 
@@ -23,12 +27,24 @@ from discord.ext import commands
 
 import allay
 
+# pylint: disable=relative-beyond-top-level
+from .config_cache import ConfigCache
+from .config_events import ConfigChange, ConfigEventBus, ConfigListener
+from .config_options import CompiledOption, InvalidOptionValue
+from .config_storage import ConfigStorage, get_storage
+
+logger = logging.getLogger(__name__)
+
 
 #==============================================================================
 # Typing
 #==============================================================================
 
-class ConfigOption(TypedDict):
+class _ConfigOptionExtras(TypedDict, total=False):
+    # Words accepted and stored as they are instead of a value of the option type, like "none"
+    keywords: list[str]
+
+class ConfigOption(_ConfigOptionExtras):
     "Represents a configuration option definition"
     default: Any
     type: Literal[
@@ -44,110 +60,378 @@ ServerConfigDict = dict[str, int | str | list[int] | list[str] | bool]
 
 CONFIG_OPTIONS: dict[str, ConfigOption] = {}
 
-CONFIG_OPTIONS.update(
+CONFIG_TEMPLATE: dict[str, Any] = {}
+
+COMPILED_OPTIONS: dict[str, CompiledOption] = {}
+
+CONFIG_FOLDER = "configs"
+
+# Managers whose cached configurations are normalized again when options are registered, by id
+# (managers are dicts, so they can't be hashed)
+_MANAGERS: "weakref.WeakValueDictionary[int, ConfigManager]" = weakref.WeakValueDictionary()
+
+def register_options(options: dict[str, ConfigOption]):
+    """Add some configuration options, or replace them
+
+    Each option is compiled once, so the values written in it are validated and normalized
+    without looking at its definition again. Configurations already loaded are normalized again
+
+    :raises ValueError: If an option type is unknown
+    """
+    compiled = {key: CompiledOption(key, option) for key, option in options.items()}
+    CONFIG_OPTIONS.update(options)
+    COMPILED_OPTIONS.update(compiled)
+    CONFIG_TEMPLATE.update({
+        key: option.default for key, option in compiled.items() if "default" in options[key]
+    })
+    for manager in list(_MANAGERS.values()):
+        manager.normalize_cached(compiled)
+
+def normalize_config(
+    guild_id: int, config: ServerConfigDict, keys: Optional[Iterable[str]] = None
+) -> ServerConfigDict:
+    """Normalize the values of a stored guild configuration, which may have been written
+    before they were validated. Invalid values are kept as they are, so they are never lost
+
+    :param keys: The options to normalize. Every registered option if not given
+    """
+    for key in list(config) if keys is None else keys:
+        if key not in config or (option := COMPILED_OPTIONS.get(key)) is None:
+            continue
+        value = config[key]
+        try:
+            config[key] = option.normalize(value)
+        except InvalidOptionValue:
+            logger.warning("Invalid %s config for guild %s: %r", key, guild_id, value)
+    return config
+
+register_options(
     {
         "admins": {
             "default": allay.BotConfig.get("core.admins"),
             "type": "categories",
             "command": None,
         },
+        "language": {
+            "default": None,
+            "type": "text",
+            "command": None,
+        },
     }
 )
 
-CONFIG_FOLDER = "configs"
-
-CONFIG_TEMPLATE = {
-    k: v["default"]
-    for k, v in CONFIG_OPTIONS.items()
-    if "default" in v
-}
-
 #==============================================================================
 # Plugin
 #==============================================================================
 
-class ServerConfig(ServerConfigDict):
-    "Represents the configuration of a bot guild"
+class ServerConfig(Mapping[str, Any]):
+    """Represents the configuration of a bot guild
+
+    This is a view over the cached guild values and the template defaults: reading it doesn't
+    copy anything. Editing it sends a new copy of the values to the manager"""
+
+    __slots__ = ("manager", "guild_id", "_values")
 
     def __init__(self, manager: "ConfigManager", server_id: int, config: ServerConfigDict):
-        super().__init__(config)
         self.manager = manager
         self.guild_id = server_id
+        self._values = config
 
     def __getitem__(self, key):
+        if key not in CONFIG_TEMPLATE:
+            raise KeyError(key)
         try:
-            return super().__getitem__(key)
-        except KeyError as exc:
-            if key in CONFIG_TEMPLATE.keys():
-                return CONFIG_TEMPLATE[key]
-            raise exc
+            return self._values[key]
+        except KeyError:
+            return CONFIG_TEMPLATE[key]
+
+    def __iter__(self):
+        return iter(CONFIG_TEMPLATE)
+
+    def __len__(self):
+        return len(CONFIG_TEMPLATE)
+
+    def __contains__(self, key):
+        return key in CONFIG_TEMPLATE
+
+    def __repr__(self):
+        return repr(dict(self))
 
     def __setitem__(self, key, item):
-        if key in CONFIG_TEMPLATE.keys():
-            super().__setitem__(key, item)
-            self.manager[self.guild_id] = self
-        else:
+        if key not in CONFIG_TEMPLATE:
             raise ValueError("Invalid config key")
+        self._values = self.manager.set_option(self.guild_id, key, item)
 
     def __delitem__(self, key):
-        super().__setitem__(key, CONFIG_TEMPLATE[key])
-        self.manager[self.guild_id] = self
+        self._values = self.manager.reset_option(self.guild_id, key)
 
 
 class ConfigManager(dict[int, ServerConfigDict]):
     """Handle the whole bot configuration for every guild
-    
-    Guild configurations are stored in separated .json files"""
 
-    def __init__(self):
+    Guild configurations are persisted by a ConfigStorage (one .json file per guild, or a table
+    of the bot database)
+
+    In write-behind mode, changes are applied to the cache immediately and saved in background
+    by a single flush, at most `write_delay` seconds after the first pending change
+
+    Loaded configurations are kept in a LRU cache, that can be bounded in entries, memory and
+    time from the bot config
+
+    Every change of an option is published to the listeners subscribed with `subscribe`"""
+
+    def __init__(self, storage: Optional[ConfigStorage] = None):
         super().__init__()
-        self.cache: dict[int, ServerConfigDict] = {}
+        self.storage = storage or get_storage(CONFIG_FOLDER)
+        self.cache: ConfigCache[ServerConfigDict] = ConfigCache(
+            max_entries=int(allay.BotConfig.get("core.server_configs.cache_entries", 0) or 0),
+            max_bytes=int(allay.BotConfig.get("core.server_configs.cache_bytes", 0) or 0),
+            ttl=float(allay.BotConfig.get("core.server_configs.cache_ttl", 0) or 0),
+        )
+        # IDs of the guilds having a stored configuration, listed from the storage once
+        self._guild_ids: Optional[set[int]] = None
+        self.events = ConfigEventBus()
+
+        # Write-behind
+        self.write_delay = float(
+            allay.BotConfig.get("core.server_configs.write_behind", 0) or 0
+        )
+        self.flushed_writes = 0
+        self._dirty: dict[int, ServerConfigDict] = {} # guild_id -> config waiting to be saved
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+        _MANAGERS[id(self)] = self
+
+    @property
+    def pending_writes(self) -> int:
+        "Number of guild configurations waiting to be saved"
+        return len(self._dirty)
 
     def __setitem__(self, key: int | str, config: ServerConfigDict):
         if not (isinstance(key, int) or key.isnumeric()):
             raise ValueError("Key need to be a valid guild ID")
         guild_id = int(key)
-        allowed_keys = CONFIG_TEMPLATE.keys()
-        config = { k: v for k, v in config.items() if k in allowed_keys }
-        with open(f"{CONFIG_FOLDER}/{guild_id}.json", "w", encoding="utf8") as f:
-            dump(config, f)
-        self.cache[int(guild_id)] = config
+        config = {
+            k: COMPILED_OPTIONS[k].normalize(v) for k, v in config.items() if k in CONFIG_TEMPLATE
+        }
+        old = self._load(guild_id) if self.events.has_listeners else config
+        self._store(guild_id, config)
+        self._publish(guild_id, old, config)
+
+    def set_option(self, guild_id: int, key: str, value: Any) -> ServerConfigDict:
+        """Edit a single option of a guild configuration, and return the new guild values
+
+        :raises InvalidOptionValue: If the value doesn't match the option type
+        """
+        if key not in CONFIG_TEMPLATE:
+            raise ValueError("Invalid config key")
+        value = COMPILED_OPTIONS[key].normalize(value)
+        old = self._load(guild_id)
+        config = dict(old)
+        config[key] = value
+        self._store(guild_id, config, key)
+        self._publish(guild_id, old, config, (key,))
+        return config
+
+    def reset_option(self, guild_id: int, key: str) -> ServerConfigDict:
+        "Reset a single option of a guild configuration, and return the new guild values"
+        if key not in CONFIG_TEMPLATE:
+            raise ValueError("Invalid config key")
+        old = self._load(guild_id)
+        config = dict(old)
+        config.pop(key, None)
+        self._store(guild_id, config, key)
+        self._publish(guild_id, old, config, (key,))
+        return config
+
+    def subscribe(self, listener: ConfigListener, *keys: str):
+        """Call a listener with the batches of changes of some options, once per loop iteration
+
+        :param listener: Function or coroutine function taking the list of ConfigChange
+        :param keys: The options to listen to. Every option if none is given
+        """
+        self.events.subscribe(listener, *keys)
+
+    def unsubscribe(self, listener: ConfigListener):
+        "Stop calling a listener subscribed with `subscribe`"
+        self.events.unsubscribe(listener)
+
+    def _publish(
+        self,
+        guild_id: int,
+        old: ServerConfigDict,
+        new: ServerConfigDict,
+        keys: Optional[Iterable[str]] = None,
+    ):
+        "Publish the changes between two versions of a guild values"
+        if not self.events.has_listeners:
+            return
+        self.events.publish(
+            ConfigChange(
+                guild_id,
+                key,
+                old.get(key, CONFIG_TEMPLATE.get(key)),
+                new.get(key, CONFIG_TEMPLATE.get(key)),
+            )
+            for key in (old.keys() | new.keys() if keys is None else keys)
+        )
+
+    def _store(self, guild_id: int, config: ServerConfigDict, edited_key: Optional[str] = None):
+        """Replace the cached values of a guild and save them, or schedule their saving
+        If only one key was edited and the storage supports it, only this key is saved"""
+        with self._lock:
+            self.cache[guild_id] = config
+            if config or self.storage.stores_empty:
+                self.guild_ids.add(guild_id)
+            else:
+                self.guild_ids.discard(guild_id)
+            if self.write_delay <= 0:
+                if edited_key is None or not self.storage.partial_updates:
+                    self.storage.save(guild_id, config)
+                elif edited_key in config:
+                    self.storage.set_option(guild_id, edited_key, config[edited_key])
+                else:
+                    self.storage.delete_option(guild_id, edited_key)
+                return
+            self._dirty[guild_id] = config
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        "Start the timer of the next background flush, if needed. The caller must hold the lock"
+        if self._flush_timer is None and self._dirty:
+            self._flush_timer = threading.Timer(self.write_delay, self._flush_in_background)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _flush_in_background(self):
+        "Save the pending changes from the timer thread, and try again later if it fails"
+        try:
+            self.flush()
+        except Exception: # pylint: disable=broad-except
+            logger.exception("Unable to save %d guild configurations", self.pending_writes)
+            with self._lock:
+                self._schedule_flush()
+
+    def flush(self):
+        "Save the pending configuration changes"
+        with self._flush_lock:
+            with self._lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                configs = self._dirty
+                self._dirty = {}
+            if not configs:
+                return
+            try:
+                self.storage.save_many(configs)
+            except Exception as exception:
+                # keep the changes that weren't saved pending, unless they were edited since
+                with self._lock:
+                    for guild_id, config in configs.items():
+                        self._dirty.setdefault(guild_id, config)
+                raise exception
+            self.flushed_writes += len(configs)
+            logger.debug("Saved %d guild configurations", len(configs))
 
     def __getitem__(self, key: int | str):
         if not (isinstance(key, int) or key.isnumeric()):
             raise ValueError("Key need to be a valid guild ID")
         guild_id = int(key)
-        result = dict(CONFIG_TEMPLATE)
-        if guild_id not in self.cache:
-            try:
-                with open(f"{CONFIG_FOLDER}/{guild_id}.json", "r", encoding="utf8") as f:
-                    self.cache[guild_id] = load(f)
-            except FileNotFoundError:
-                self.cache[guild_id] = result
-        result.update(self.cache[guild_id])
-        allowed_keys = CONFIG_TEMPLATE.keys()
-        result = { k: v for k, v in result.items() if k in allowed_keys }
-        return ServerConfig(self, guild_id, result)
+        return ServerConfig(self, guild_id, self._load(guild_id))
+
+    def _load(self, guild_id: int) -> ServerConfigDict:
+        "Get the cached values of a guild, loading them if needed"
+        config = self.cache.get(guild_id)
+        if config is None:
+            # an evicted configuration may still be waiting to be saved
+            config = self._dirty.get(guild_id)
+            if config is None:
+                config = normalize_config(guild_id, self.storage.load(guild_id) or {})
+            self.cache[guild_id] = config
+        return config
+
+    def normalize_cached(self, keys: Iterable[str]):
+        """Normalize some options of the cached configurations, which were loaded before
+        these options were registered"""
+        keys = list(keys)
+        with self._lock:
+            for guild_id, config in self.cache.items():
+                normalize_config(guild_id, config, keys)
+            for guild_id, config in self._dirty.items():
+                normalize_config(guild_id, config, keys)
+
+    async def warm_up(self, guild_ids: Iterable[int], chunk_size: int = 500) -> int:
+        """Load the configurations of several guilds in the cache, without blocking the event loop
+
+        Guilds are loaded by chunks, in parallel on the default executor threads. Guilds already
+        cached are skipped, and at most as many guilds as the cache can hold are loaded
+
+        :param guild_ids: The guilds to load
+        :param chunk_size: The number of guilds loaded at once by a thread
+        :return: The number of loaded guilds
+        """
+        missing = [guild_id for guild_id in guild_ids if guild_id not in self.cache]
+        if self.cache.max_entries > 0:
+            missing = missing[:max(0, self.cache.max_entries - len(self.cache))]
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(None, self._warm_up_chunk, missing[i:i + chunk_size])
+            for i in range(0, len(missing), chunk_size)
+        ))
+        return len(missing)
+
+    def _warm_up_chunk(self, guild_ids: list[int]):
+        "Load a chunk of guild configurations in the cache"
+        configs = self.storage.load_many(guild_ids)
+        with self._lock:
+            for guild_id in guild_ids:
+                # don't overwrite a configuration edited while the chunk was loading
+                if guild_id not in self.cache:
+                    config = self._dirty.get(guild_id)
+                    if config is None:
+                        config = normalize_config(guild_id, configs.get(guild_id, {}))
+                    self.cache[guild_id] = config
+
+    @property
+    def guild_ids(self) -> set[int]:
+        "IDs of the guilds having a configuration, saved or waiting to be saved"
+        if self._guild_ids is None:
+            self._guild_ids = set(self.storage.guild_ids())
+        return self._guild_ids
 
     def __repr__(self):
         return "<ConfigManager>"
 
     def __len__(self):
-        return len(
-            [name for name in os.listdir(CONFIG_FOLDER) if os.path.isfile(name)]
-        )
+        return len(self.guild_ids)
+
+    def __iter__(self):
+        return iter(list(self.guild_ids))
 
     def __delitem__(self, key: int | str):
         if not (isinstance(key, int) or key.isnumeric()):
             raise ValueError("Key need to be a valid guild ID")
         guild_id = int(key)
-        os.remove(f"{CONFIG_FOLDER}/{guild_id}.json")
-        if guild_id in self.cache:
-            del self.cache[guild_id]
+        old = self._load(guild_id) if self.events.has_listeners else {}
+        # a flush in progress could save the configuration again after its deletion
+        with self._flush_lock, self._lock:
+            pending = self._dirty.pop(guild_id, None) is not None
+            try:
+                self.storage.delete(guild_id)
+            except FileNotFoundError:
+                # a configuration waiting for its first save has nothing to delete yet
+                if not pending:
+                    raise
+            finally:
+                del self.cache[guild_id]
+                self.guild_ids.discard(guild_id)
+        self._publish(guild_id, old, {})
 
     def has_key(self, k):
-        "Check if a guild has a configuration file"
-        return os.path.isfile(f"{CONFIG_FOLDER}/{k}.json")
+        "Check if a guild has a stored configuration"
+        return k in self
 
     def update(self, *args: dict[int, ServerConfigDict], **kwargs: ServerConfigDict):
         for arg in args:
@@ -158,10 +442,13 @@ class ConfigManager(dict[int, ServerConfigDict]):
             self[guild_id] = guild_config
 
     def keys(self):
-        return [int(name) for name in os.listdir(CONFIG_FOLDER) if os.path.isfile(name)]
+        return list(self.guild_ids)
 
-    def __contains__(self, item: int):
-        return item in self
+    def __contains__(self, item: int | str):
+        try:
+            return int(item) in self.guild_ids
+        except (TypeError, ValueError):
+            return False
 
 class ConfigCog(commands.Cog):
     "Bot cog to handle guild configuration"
@@ -169,3 +456,38 @@ class ConfigCog(commands.Cog):
         self.bot = bot
         self.file = "configManager"
         self.conf_manager = ConfigManager()
+        self._warm_up_task: Optional[asyncio.Task] = None
+
+    async def cog_load(self):
+        self.conf_manager.subscribe(self._on_language_change, "language")
+        # builtins are loaded once the bot is ready, so on_ready was already dispatched
+        if self.bot.is_ready():
+            self._start_warm_up()
+
+    def _on_language_change(self, changes: list[ConfigChange]):
+        for change in changes:
+            allay.I18N.invalidate_guild_locale(change.guild_id)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        "Load the configurations of the connected guilds again after a reconnection"
+        self._start_warm_up()
+
+    def _start_warm_up(self):
+        "Load the configurations of the connected guilds in background, if enabled"
+        if not allay.BotConfig.get("core.server_configs.warm_up", False):
+            return
+        if self._warm_up_task is None or self._warm_up_task.done():
+            self._warm_up_task = asyncio.create_task(self.warm_up())
+
+    async def warm_up(self):
+        "Load the configurations of the connected guilds in the cache"
+        start = time.perf_counter()
+        count = await self.conf_manager.warm_up([guild.id for guild in self.bot.guilds])
+        logger.info(
+            "Loaded %d guild configurations in %.2fs", count, time.perf_counter() - start
+        )
+
+    def on_bot_close(self):
+        "Save the pending configuration changes before the bot stops"
+        self.conf_manager.flush()
@@ -0,0 +1,139 @@
+"""
+Ce programme est régi par la licence CeCILL soumise au droit français et
+respectant les principes de diffusion des logiciels libres. Vous pouvez
+utiliser, modifier et/ou redistribuer ce programme sous les conditions
+de la licence CeCILL diffusée sur le site "http://www.cecill.info".
+"""
+
+#==============================================================================
+# Requirements
+#==============================================================================
+
+# Standard libs ---------------------------------------------------------------
+
+from typing import Any, Callable, Mapping, Optional
+
+#==============================================================================
+# Errors
+#==============================================================================
+
+class InvalidOptionValue(ValueError):
+    "Raised when a value doesn't match the type of a configuration option"
+
+    def __init__(self, key: str, value: Any):
+        super().__init__(f"Invalid value for the {key} config: {value!r}")
+        self.key = key
+        self.value = value
+
+#==============================================================================
+# Normalizers
+#==============================================================================
+
+# Each normalizer converts an accepted input to the stored form of its type, or raises
+# TypeError/ValueError. Stored forms are JSON-compatible, so they can be saved as is.
+# None (no value) is accepted by every type and never reaches the normalizers
+
+def _to_id(value: Any) -> int:
+    "Get a Discord ID from an int, a numeric string or a Discord object"
+    if isinstance(value, bool):
+        raise TypeError(value)
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        return int(value)
+    return int(value.id)
+
+def _to_ids(value: Any) -> list[int]:
+    "Get a list of Discord IDs from a single value or an iterable of values"
+    if isinstance(value, (str, int)) or hasattr(value, "id"):
+        return [_to_id(value)]
+    return [_to_id(item) for item in value]
+
+def _to_emoji(value: Any) -> str:
+    "Get the stored form of an emoji: its ID for custom emojis, else its text"
+    if isinstance(value, str):
+        return value
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    if (emoji_id := getattr(value, "id", None)) is not None:
+        return str(emoji_id)
+    if (name := getattr(value, "name", None)) is not None:
+        return str(name)
+    raise TypeError(value)
+
+def _to_emojis(value: Any) -> list[str]:
+    "Get a list of stored emojis from a single value or an iterable of values"
+    if isinstance(value, (str, int)) or hasattr(value, "name"):
+        return [_to_emoji(value)]
+    return [_to_emoji(item) for item in value]
+
+def _to_int(value: Any) -> int:
+    if isinstance(value, bool):
+        raise TypeError(value)
+    return int(value)
+
+def _to_text(value: Any) -> str:
+    if not isinstance(value, str):
+        raise TypeError(value)
+    return value
+
+NORMALIZERS: dict[str, Callable[[Any], Any]] = {
+    "roles": _to_ids,
+    "channels": _to_ids,
+    "categories": _to_ids,
+    "emojis": _to_emojis,
+    "int": _to_int,
+    "text": _to_text,
+}
+
+# Keywords of options declared before they could declare their own, formatted by sconfig
+DEFAULT_KEYWORDS: dict[str, tuple[str, ...]] = {
+    "levelup_channel": ("none", "any"),
+}
+
+#==============================================================================
+# Compiled options
+#==============================================================================
+
+class CompiledOption:
+    "A configuration option, with the functions validating its values resolved once"
+
+    __slots__ = ("key", "type", "default", "command", "keywords", "_normalizer")
+
+    def __init__(self, key: str, option: Mapping[str, Any]):
+        if option["type"] not in NORMALIZERS:
+            raise ValueError(f"Unknown config type {option['type']!r} for the {key} config")
+        self.key = key
+        self.type: str = option["type"]
+        self.command: Optional[str] = option.get("command")
+        self.keywords = frozenset(
+            word.lower() for word in option.get("keywords", DEFAULT_KEYWORDS.get(key, ()))
+        )
+        self._normalizer = NORMALIZERS[self.type]
+        self.default = self.normalize(option.get("default"))
+
+    def __repr__(self):
+        return f"<CompiledOption {self.key} type={self.type}>"
+
+    def normalize(self, value: Any) -> Any:
+        """Validate a value and convert it to its stored form. None and the keywords of the
+        option are kept as they are
+
+        :raises InvalidOptionValue: If the value doesn't match the option type
+        """
+        if value is None:
+            return None
+        if isinstance(value, str) and value.lower() in self.keywords:
+            return value.lower()
+        try:
+            return self._normalizer(value)
+        except (TypeError, ValueError, AttributeError) as exception:
+            raise InvalidOptionValue(self.key, value) from exception
+
+    def is_valid(self, value: Any) -> bool:
+        "Check if a value can be stored in this option"
+        try:
+            self.normalize(value)
+        except InvalidOptionValue:
+            return False
+        return True
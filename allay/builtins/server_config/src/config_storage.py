@@ -0,0 +1,279 @@
+"""
+Ce programme est régi par la licence CeCILL soumise au droit français et
+respectant les principes de diffusion des logiciels libres. Vous pouvez
+utiliser, modifier et/ou redistribuer ce programme sous les conditions
+de la licence CeCILL diffusée sur le site "http://www.cecill.info".
+"""
+
+#==============================================================================
+# Requirements
+#==============================================================================
+
+# Standard libs ---------------------------------------------------------------
+
+import itertools
+import logging
+import os
+import threading
+from json import dumps, loads
+from typing import Any, Iterable, Optional
+
+# Project modules -------------------------------------------------------------
+
+import allay
+
+# pylint: disable=relative-beyond-top-level
+from .config_codecs import EXTENSIONS, ConfigCodec, JsonCodec, get_codec, get_reader
+
+logger = logging.getLogger(__name__)
+
+#==============================================================================
+# Storages
+#==============================================================================
+
+class ConfigStorage:
+    "Base class of the guild configurations persistence backends"
+
+    # Whether set_option and delete_option update a single option without rewriting the whole
+    # guild configuration. Otherwise, saving the whole configuration is cheaper
+    partial_updates = False
+    # Whether a guild whose configuration is empty still has a stored configuration
+    stores_empty = True
+
+    def load(self, guild_id: int) -> Optional[dict[str, Any]]:
+        "Get the stored configuration of a guild, or None if it has none"
+        raise NotImplementedError
+
+    def load_many(self, guild_ids: Iterable[int]) -> dict[int, dict[str, Any]]:
+        "Get the stored configuration of several guilds. Guilds without one are omitted"
+        configs = {}
+        for guild_id in guild_ids:
+            if (config := self.load(guild_id)) is not None:
+                configs[guild_id] = config
+        return configs
+
+    def save(self, guild_id: int, config: dict[str, Any]):
+        "Replace the whole configuration of a guild"
+        raise NotImplementedError
+
+    def save_many(self, configs: dict[int, dict[str, Any]]):
+        "Replace the whole configuration of several guilds"
+        for guild_id, config in configs.items():
+            self.save(guild_id, config)
+
+    def set_option(self, guild_id: int, key: str, value: Any):
+        "Edit a single option of a guild configuration"
+        config = self.load(guild_id) or {}
+        config[key] = value
+        self.save(guild_id, config)
+
+    def delete_option(self, guild_id: int, key: str):
+        "Remove a single option of a guild configuration"
+        if (config := self.load(guild_id)) is not None and key in config:
+            del config[key]
+            self.save(guild_id, config)
+
+    def delete(self, guild_id: int):
+        "Delete the configuration of a guild"
+        raise NotImplementedError
+
+    def exists(self, guild_id: int) -> bool:
+        "Check if a guild has a stored configuration"
+        return self.load(guild_id) is not None
+
+    def guild_ids(self) -> list[int]:
+        "List the guilds having a stored configuration"
+        raise NotImplementedError
+
+
+class FileConfigStorage(ConfigStorage):
+    """Store each guild configuration in its own file, serialized by a codec (JSON by default)
+
+    Files written with another codec (after the codec was changed in the bot config) are still
+    read, and replaced by the new format when their guild configuration is saved again"""
+
+    def __init__(self, folder: str, codec: Optional[ConfigCodec] = None):
+        self.folder = folder
+        self.codec = codec or JsonCodec()
+        os.makedirs(folder, exist_ok=True)
+        # extensions of the files written with another codec, looked up only if some exist
+        self._other_extensions = {
+            os.path.splitext(name)[1] for name in os.listdir(folder)
+        } & (EXTENSIONS - {self.codec.extension})
+        self._readers: dict[str, ConfigCodec] = {self.codec.extension: self.codec}
+
+    def _path(self, guild_id: int, extension: Optional[str] = None):
+        return os.path.join(self.folder, f"{guild_id}{extension or self.codec.extension}")
+
+    def _reader(self, extension: str) -> ConfigCodec:
+        if extension not in self._readers:
+            self._readers[extension] = get_reader(extension)
+        return self._readers[extension]
+
+    def load(self, guild_id: int) -> Optional[dict[str, Any]]:
+        for extension in (self.codec.extension, *self._other_extensions):
+            try:
+                with open(self._path(guild_id, extension), "rb") as file:
+                    return self._reader(extension).loads(file.read())
+            except FileNotFoundError:
+                continue
+        return None
+
+    def save(self, guild_id: int, config: dict[str, Any]):
+        # write a temporary file then rename it, so the file is never left half-written
+        path = self._path(guild_id)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as file:
+                file.write(self.codec.dumps(config))
+            os.replace(temp_path, path)
+        except BaseException as exception:
+            os.remove(temp_path)
+            raise exception
+        for extension in self._other_extensions:
+            try:
+                os.remove(self._path(guild_id, extension))
+            except FileNotFoundError:
+                pass
+
+    def delete(self, guild_id: int):
+        deleted = False
+        for extension in (self.codec.extension, *self._other_extensions):
+            try:
+                os.remove(self._path(guild_id, extension))
+                deleted = True
+            except FileNotFoundError:
+                pass
+        if not deleted:
+            raise FileNotFoundError(self._path(guild_id))
+
+    def exists(self, guild_id: int) -> bool:
+        return any(
+            os.path.isfile(self._path(guild_id, extension))
+            for extension in (self.codec.extension, *self._other_extensions)
+        )
+
+    def guild_ids(self) -> list[int]:
+        extensions = {self.codec.extension, *self._other_extensions}
+        guild_ids = set()
+        for name in os.listdir(self.folder):
+            guild_id, extension = os.path.splitext(name)
+            if extension in extensions and guild_id.isnumeric():
+                guild_ids.add(int(guild_id))
+        return list(guild_ids)
+
+# Kept for the code written when JSON was the only format
+JsonConfigStorage = FileConfigStorage
+
+
+class SqliteConfigStorage(ConfigStorage):
+    """Store every guild configuration in a single table of the bot database
+
+    Each option is a row, so a single option can be edited without rewriting the whole guild
+    configuration. Values are JSON-encoded"""
+
+    # Keep the number of variables of a query under the sqlite limit
+    CHUNK_SIZE = 500
+
+    partial_updates = True
+    stores_empty = False # each option is a row, so an empty configuration has no rows
+
+    def load(self, guild_id: int) -> Optional[dict[str, Any]]:
+        return self.load_many([guild_id]).get(guild_id)
+
+    def load_many(self, guild_ids: Iterable[int]) -> dict[int, dict[str, Any]]:
+        configs: dict[int, dict[str, Any]] = {}
+        guild_ids = iter(guild_ids)
+        while chunk := list(itertools.islice(guild_ids, self.CHUNK_SIZE)):
+            rows = allay.Database.query(
+                "SELECT guild_id, key, value FROM server_configs"
+                f" WHERE guild_id IN ({', '.join('?' * len(chunk))})",
+                tuple(chunk),
+                astuple=True,
+            )
+            for guild_id, key, value in rows:
+                configs.setdefault(guild_id, {})[key] = loads(value)
+        return configs
+
+    def save(self, guild_id: int, config: dict[str, Any]):
+        self.save_many({guild_id: config})
+
+    def save_many(self, configs: dict[int, dict[str, Any]]):
+        "Replace the whole configuration of several guilds in a single transaction"
+        with allay.Database.transaction():
+            allay.Database.query_many(
+                "DELETE FROM server_configs WHERE guild_id = ?",
+                ((guild_id,) for guild_id in configs),
+            )
+            allay.Database.query_many(
+                "INSERT INTO server_configs (guild_id, key, value) VALUES (?, ?, ?)",
+                (
+                    (guild_id, key, dumps(value))
+                    for guild_id, config in configs.items()
+                    for key, value in config.items()
+                ),
+            )
+
+    def set_option(self, guild_id: int, key: str, value: Any):
+        allay.Database.query(
+            "INSERT INTO server_configs (guild_id, key, value) VALUES (?, ?, ?)"
+            " ON CONFLICT (guild_id, key) DO UPDATE SET value = excluded.value",
+            (guild_id, key, dumps(value)),
+        )
+
+    def delete_option(self, guild_id: int, key: str):
+        allay.Database.query(
+            "DELETE FROM server_configs WHERE guild_id = ? AND key = ?", (guild_id, key)
+        )
+
+    def delete(self, guild_id: int):
+        allay.Database.query("DELETE FROM server_configs WHERE guild_id = ?", (guild_id,))
+
+    def exists(self, guild_id: int) -> bool:
+        return bool(allay.Database.query(
+            "SELECT 1 FROM server_configs WHERE guild_id = ? LIMIT 1", (guild_id,), astuple=True
+        ))
+
+    def guild_ids(self) -> list[int]:
+        return [
+            row[0] for row in allay.Database.query(
+                "SELECT DISTINCT guild_id FROM server_configs", astuple=True
+            )
+        ]
+
+    def import_json_folder(self, folder: str) -> int:
+        """Copy every guild configuration of a FileConfigStorage folder in the database
+
+        :param folder: The folder containing the guild configuration files
+        :return: The number of imported guilds
+        """
+        source = FileConfigStorage(folder)
+        guild_ids = source.guild_ids()
+        for offset in range(0, len(guild_ids), self.CHUNK_SIZE):
+            self.save_many(source.load_many(guild_ids[offset:offset + self.CHUNK_SIZE]))
+        return len(guild_ids)
+
+
+def get_storage(folder: str) -> ConfigStorage:
+    """Create the storage backend selected in the bot config
+
+    When switching to the sqlite backend, the configurations stored in the JSON folder are
+    imported once, then the folder is renamed so it isn't imported again. Folders imported
+    before are kept, the new one gets a numbered name"""
+    backend = allay.BotConfig.get("core.server_configs.storage", "json")
+    if backend == "json":
+        return FileConfigStorage(
+            folder, get_codec(allay.BotConfig.get("core.server_configs.codec", "json"))
+        )
+    if backend == "sqlite":
+        storage = SqliteConfigStorage()
+        if os.path.isdir(folder):
+            count = storage.import_json_folder(folder)
+            target, number = folder + ".migrated", 1
+            while os.path.exists(target):
+                number += 1
+                target = f"{folder}.migrated-{number}"
+            os.rename(folder, target)
+            logger.info("Imported %d guild configurations from %s in the database", count, folder)
+        return storage
+    raise ValueError(f"Unknown server configs storage: {backend}")
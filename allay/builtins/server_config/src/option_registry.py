@@ -0,0 +1,79 @@
+"""
+Ce programme est régi par la licence CeCILL soumise au droit français et
+respectant les principes de diffusion des logiciels libres. Vous pouvez
+utiliser, modifier et/ou redistribuer ce programme sous les conditions
+de la licence CeCILL diffusée sur le site "http://www.cecill.info".
+"""
+
+#==============================================================================
+# Requirements
+#==============================================================================
+
+# Standard libs ---------------------------------------------------------------
+
+from typing import Optional
+
+# Third party libs ------------------------------------------------------------
+
+from discord.ext import commands
+
+# Project modules -------------------------------------------------------------
+
+# pylint: disable=relative-beyond-top-level
+from .config_manager import ConfigOption
+
+#==============================================================================
+# Registry
+#==============================================================================
+
+class OptionRegistry:
+    """Index the configuration options of the loaded cogs
+
+    Options are indexed by cog and cogs by option, and the `config <command>` command of each
+    option is resolved once, so loading or unloading a cog only touches its own options"""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.cog_options: dict[str, dict[str, ConfigOption]] = {} # cog name -> its options
+        self.option_cogs: dict[str, str] = {} # option -> name of the cog declaring it
+        self._commands: dict[str, commands.Command] = {} # option -> its config command
+
+    def __contains__(self, cog_name: str):
+        return cog_name in self.cog_options
+
+    def add_cog(self, cog_name: str, options: dict[str, ConfigOption]):
+        "Index the options of a cog, replacing the ones it had"
+        self.remove_cog(cog_name)
+        self.cog_options[cog_name] = options
+        for key in options:
+            self.option_cogs[key] = cog_name
+
+    def remove_cog(self, cog_name: str) -> dict[str, ConfigOption]:
+        "Forget the options of a cog, and return them"
+        options = self.cog_options.pop(cog_name, {})
+        for key in options:
+            if self.option_cogs.get(key) == cog_name:
+                del self.option_cogs[key]
+            self._commands.pop(key, None)
+        return options
+
+    def get_cog_name(self, key: str) -> Optional[str]:
+        "Get the name of the cog declaring an option"
+        return self.option_cogs.get(key)
+
+    def get_command(self, key: str) -> Optional[commands.Command]:
+        "Get the `config <command>` command editing an option, if it has one"
+        if (command := self._commands.get(key)) is not None:
+            return command
+        cog_name = self.option_cogs.get(key)
+        if cog_name is None or not (command_name := self.cog_options[cog_name][key].get("command")):
+            return None
+        if (command := self.bot.get_command("config " + command_name)) is not None:
+            self._commands[key] = command
+        return command
+
+    def set_commands_enabled(self, options: dict[str, ConfigOption], enabled: bool):
+        "Enable or disable the config commands of some options"
+        for key in options:
+            if (command := self.get_command(key)) is not None:
+                command.enabled = enabled
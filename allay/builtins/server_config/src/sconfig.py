@@ -11,7 +11,8 @@ de la licence CeCILL diffusée sur le site "http://www.cecill.info".
 
 # Standard libs ---------------------------------------------------------------
 
-from typing import Any, Optional, Sequence
+import functools
+from typing import Any, Optional
 
 # Third party libs ------------------------------------------------------------
 
@@ -24,9 +25,22 @@ from discord.ext import commands
 import allay
 
 # pylint: disable=relative-beyond-top-level
-from .config_manager import CONFIG_OPTIONS, ConfigOption
+from .config_cache import ConfigCache
+from .config_events import ConfigChange
+from .config_manager import COMPILED_OPTIONS, CONFIG_OPTIONS, ConfigOption, register_options
+from .config_options import InvalidOptionValue
+from .option_registry import OptionRegistry
 
 
+#==============================================================================
+# Utils
+#==============================================================================
+
+@functools.lru_cache(maxsize=1024)
+def emojize_alias(text: str) -> str:
+    "Convert the :alias: emojis of a text to unicode, remembering the most used texts"
+    return emoji.emojize(text, language="alias")
+
 #==============================================================================
 # Plugin
 #==============================================================================
@@ -37,15 +51,99 @@ class Sconfig(commands.Cog):
     def __init__(self, bot: allay.Bot):
         self.bot = bot
         self.file = "sconfig"
-        self.sorted_options: dict[str, dict[str, ConfigOption]] = {}  # config options sorted by cog
+        self.options = OptionRegistry(bot)
+        # config options sorted by cog
+        self.sorted_options: dict[str, dict[str, ConfigOption]] = self.options.cog_options
         self.config_options: list[str] = []
         for cog in bot.cogs.values():
             self._add_options_from_cog(cog)
         # for whatever reason, the for loop above doesn't include its own cog,
         # so we just force it
-        self.sorted_options[self.__cog_name__] = {
-            k: v for k, v in CONFIG_OPTIONS.items() if k in self.config_options
-        }
+        self.options.add_cog(
+            self.__cog_name__, {k: CONFIG_OPTIONS[k] for k in self.config_options}
+        )
+        # guild_id -> module -> (option, formatted value) rows of the config overview
+        self._rendered: ConfigCache[dict[str, list[tuple[str, str]]]] = ConfigCache(
+            max_entries=int(
+                allay.BotConfig.get("core.server_configs.render_cache_entries", 1000) or 0
+            ),
+        )
+        # incremented on every invalidation, so a render outdated while running isn't cached
+        self._render_version = 0
+
+    async def cog_load(self):
+        self.bot.server_configs.subscribe(self._on_config_change)
+
+    async def cog_unload(self):
+        self.bot.server_configs.unsubscribe(self._on_config_change)
+
+    # Rendered overview cache -------------------------------------------------
+
+    def invalidate_rendered(self, guild_id: Optional[int] = None):
+        "Forget the rendered config overview of a guild, or of every guild"
+        self._render_version += 1
+        if guild_id is None:
+            self._rendered.clear()
+        else:
+            del self._rendered[guild_id]
+
+    def _on_config_change(self, changes: list[ConfigChange]):
+        for guild_id in {change.guild_id for change in changes}:
+            self.invalidate_rendered(guild_id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        self.invalidate_rendered(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.invalidate_rendered(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, _before: discord.Role, after: discord.Role):
+        self.invalidate_rendered(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        self.invalidate_rendered(channel.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.invalidate_rendered(channel.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(
+        self, _before: discord.abc.GuildChannel, after: discord.abc.GuildChannel
+    ):
+        self.invalidate_rendered(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_emojis_update(self, _guild: discord.Guild, _before, _after):
+        # custom emojis of a guild can be used in the config of any other guild
+        self.invalidate_rendered()
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.invalidate_rendered(guild.id)
+
+    async def _render_config(self, guild: discord.Guild) -> dict[str, list[tuple[str, str]]]:
+        "Get the formatted options of a guild sorted by module, formatting each value once"
+        if (rendered := self._rendered.get(guild.id)) is not None:
+            return rendered
+        version = self._render_version
+        config = self.bot.server_configs[guild.id]
+        rendered = {}
+        for module, options in self.sorted_options.items():
+            rows = [
+                (key, str(await self.format_config(guild, key, config[key], mention=False)))
+                for key in config
+                if key in options
+            ]
+            if rows:
+                rendered[module] = rows
+        if version == self._render_version:
+            self._rendered[guild.id] = rendered
+        return rendered
 
     def on_anycog_load(self, cog: commands.Cog):
         """Used to enable config commands when a cog is enabled
@@ -54,14 +152,11 @@ class Sconfig(commands.Cog):
         -----------
         cog: :class:`commands.Cog`
             The cog which got enabled"""
-        self._add_options_from_cog(cog)
-        if cog.__cog_name__ not in self.sorted_options:
+        if not self._add_options_from_cog(cog):
             return
-        for opt in self.sorted_options[cog.__cog_name__].values():
-            # we enable the commands if needed
-            if (command_name := opt.get("command")) and (
-                command := self.bot.get_command("config " + command_name)):
-                command.enabled = True
+        self.invalidate_rendered()
+        # we enable the commands if needed
+        self.options.set_commands_enabled(self.options.cog_options[cog.__cog_name__], True)
 
     def on_anycog_unload(self, cog: str):
         """Used to disable config commands when a cog is disabled
@@ -70,24 +165,22 @@ class Sconfig(commands.Cog):
         -----------
         cog: :class:`str`
             The name of the disabeld cog"""
-        if cog in self.sorted_options:
-            for opt in self.sorted_options[cog].values():
-                # we disable the commands if needed
-                if (command_name := opt.get("command")) and (
-                    command := self.bot.get_command("config " + command_name)):
-                    command.enabled = True
-            del self.sorted_options[cog]
-
-    def _add_options_from_cog(self, cog: commands.Cog):
-        "Append the cog-related configuration to the config options"
+        if cog in self.options:
+            self.invalidate_rendered()
+            # we disable the commands if needed
+            self.options.set_commands_enabled(self.options.cog_options[cog], False)
+            self.options.remove_cog(cog)
+
+    def _add_options_from_cog(self, cog: commands.Cog) -> bool:
+        """Append the cog-related configuration to the config options
+        Return False if the cog doesn't have any specific config"""
         if not hasattr(cog, "config_options"):
-            # if the cog doesn't have any specific config
-            return
+            return False
         if not isinstance(cog.config_options, dict): # type: ignore
             raise TypeError("config_options must be a dict of config_name -> ConfigOption")
-        self.sorted_options[cog.__cog_name__] = {
-            k: v for k, v in CONFIG_OPTIONS.items() if k in cog.config_options # type: ignore
-        }
+        register_options(cog.config_options) # type: ignore
+        self.options.add_cog(cog.__cog_name__, cog.config_options) # type: ignore
+        return True
 
     async def edit_config(self, guild_id: int, key: str, value: Any):
         """Edit or reset a config option for a guild
@@ -107,6 +200,8 @@ class Sconfig(commands.Cog):
             return allay.I18N.tr(guild_id, "sconfig.option-reset", opt=key)
         try:
             self.bot.server_configs[guild_id][key] = value
+        except InvalidOptionValue:
+            return allay.I18N.tr(guild_id, "sconfig.option-invalid", opt=key)
         except ValueError:
             return allay.I18N.tr(guild_id, "sconfig.option-notfound", opt=key)
         return allay.I18N.tr(guild_id, "sconfig.option-edited", opt=key)
@@ -114,52 +209,42 @@ class Sconfig(commands.Cog):
     async def format_config(self, guild: discord.Guild, key: str,
                             value: int | str | list[int] | list[str] | bool,
                             mention: bool = True) -> Optional[str]:
-        "Format a configuration value in a nice human-readable string"
+        """Format a configuration value in a nice human-readable string
+        Values were validated and normalized when written, so their type isn't checked again"""
         if value is None:
             return None
-        config = CONFIG_OPTIONS[key]
+        option = COMPILED_OPTIONS[key]
+        option_type = option.type
 
         def getname(x: discord.Role | discord.abc.GuildChannel):
             return x.mention if mention else x.name
 
         sep = " " if mention else " | "
-        if key == "levelup_channel":
-            if value in (None, "none", "any"):
-                return str(value).capitalize()
-        if config["type"] == "roles":
-            if not isinstance(value, list) or not all(isinstance(x, int) for x in value):
-                raise ValueError("Invalid value for roles config")
-            roles = [guild.get_role(int(x)) for x in value]
+        if isinstance(value, str) and value in option.keywords:
+            return value.capitalize()
+        if option_type == "roles":
+            roles = [guild.get_role(x) for x in value] # type: ignore
             roles = [getname(x) for x in roles if x is not None]
             return sep.join(roles)
-        if config["type"] == "channels":
-            if not isinstance(value, list) or not all(isinstance(x, int) for x in value):
-                raise ValueError("Invalid value for roles config")
-            channels = [guild.get_channel(int(x)) for x in value]
+        if option_type == "channels":
+            channels = [guild.get_channel(x) for x in value] # type: ignore
             channels = [getname(x) for x in channels if x is not None]
             return sep.join(channels)
-        if config["type"] == "categories":
-            if not isinstance(value, list) or not all(isinstance(x, int) for x in value):
-                raise ValueError("Invalid value for roles config")
-            categories = [guild.get_channel(int(x)) for x in value]
+        if option_type == "categories":
+            categories = [guild.get_channel(x) for x in value] # type: ignore
             categories = [x.name for x in categories if x is not None]
             return " | ".join(categories)
-        if config["type"] == "emojis":
+        if option_type == "emojis":
 
-            def emojis_convert(s_emoji: str, bot_emojis: Sequence[discord.Emoji]) -> str:
+            def emojis_convert(s_emoji: str) -> str:
                 if s_emoji.isnumeric():
-                    if d_em := discord.utils.get(bot_emojis, id=int(s_emoji)):
+                    # the client keeps its emojis indexed by ID, up to date with emoji events
+                    if d_em := self.bot.get_emoji(int(s_emoji)):
                         return f":{d_em.name}:"
                     return ":deleted_emoji:"
-                return emoji.emojize(s_emoji, language="alias")
-
-            if not isinstance(value, list) or not all(isinstance(x, str) for x in value):
-                raise ValueError("Invalid value for roles config")
-            return " ".join(emojis_convert(str(x), self.bot.emojis) for x in value)
-        if config["type"] == "int":
-            if not isinstance(value, int):
-                raise ValueError("Invalid value for int config")
-            return str(value)
+                return emojize_alias(s_emoji)
+
+            return " ".join(emojis_convert(x) for x in value) # type: ignore
         return str(value)
 
     @commands.group(name="config")
@@ -170,51 +255,24 @@ class Sconfig(commands.Cog):
         if ctx.guild is None: # type guard (shouldn't happen)
             return
         if ctx.subcommand_passed is None:
-            # get the server config
-            config = ctx.bot.server_configs[ctx.guild.id]
-
-            # get the length of the longest key to align the values in columns
-            max_key_length = 0
-            max_value_length = 0
-            for options in self.sorted_options.values():
-                configs_len = [len(k) for k in config.keys() if k in options]
-                max_key_length = (
-                    max(max_key_length, *configs_len)
-                    if len(configs_len) > 0
-                    else max_key_length
-                )
-                values_len = [
-                    len(str(await self.format_config(ctx.guild, k, v, mention=False)))
-                    for k, v in config.items()
-                    if k in options
-                ]
-                max_value_length = (
-                    max(max_value_length, *values_len)
-                    if len(values_len) > 0
-                    else max_value_length
-                )
-            max_key_length += 3
-            max_value_length += 1
+            rendered = await self._render_config(ctx.guild)
+
+            # get the length of the longest key and value to align the values in columns
+            max_key_length = max(
+                (len(k) for rows in rendered.values() for k, _ in rows), default=0
+            ) + 3
+            max_value_length = max(
+                (len(v) for rows in rendered.values() for _, v in rows), default=0
+            ) + 1
 
             # iterate over modules
             cpt = 0
             embeds = []
-            for module, options in sorted(self.sorted_options.items()):
-
-                subconf = {k: v for k, v in config.items() if k in options}
-                if len(subconf) == 0:
-                    continue
-
-                module_config = ""
-
-                # iterate over configs for that group
-                for k, v in subconf.items():
-                    value = await self.format_config(ctx.guild, k, v, False)
-                    module_config += (
-                        (f"{k}:").ljust(max_key_length)
-                        + f" {value}".ljust(max_value_length)
-                        + "\n"
-                    )
+            for module, rows in sorted(rendered.items()):
+                module_config = "".join(
+                    (f"{k}:").ljust(max_key_length) + f" {v}".ljust(max_value_length) + "\n"
+                    for k, v in rows
+                )
 
                 if hasattr(self.bot.get_cog(module), "_create_config"):
                     for extra in await self.bot.get_cog(module)._create_config(ctx): # type: ignore # pylint: disable=protected-access
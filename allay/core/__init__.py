@@ -7,7 +7,7 @@ de la licence CeCILL diffusée sur le site "http://www.cecill.info".
 
 __version__ = "0.0.1"
 
-from allay.core.src import bot_config, database, discord, i18n
+from allay.core.src import bot_config, database, discord, i18n, migrations, query_stats
 
 # Shortcuts -------------------------------------------------------------------
 
@@ -23,6 +23,8 @@ __all__ = [
     "database",
     "discord",
     "i18n",
+    "migrations",
+    "query_stats",
 
     "Bot",
     "BotConfig",
@@ -1,4 +1,7 @@
 import asyncio
+import hashlib
+import json
+import os
 
 import art
 import discord
@@ -6,10 +9,13 @@ import logging
 import importlib
 
 import allay
-from allay.core.src.discord import Bot
+from allay.core.src.discord import Bot, I18NTranslator
 
 logger = logging.getLogger(__name__)
 
+# Hash of the last synced app commands payload, to skip syncing an unchanged tree
+APP_COMMANDS_HASH_PATH = "data/app_commands.sha256"
+
 
 def instanciate_bot():
     "Create the bot instance and returns it"
@@ -69,21 +75,54 @@ async def on_bot_ready(bot: Bot):
     print(" ")
     await load_plugins(bot)
 
+    # Watch lang files ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    if (interval := float(allay.BotConfig.get("core.i18n.hot_reload", 0) or 0)) > 0:
+        allay.I18N.start_watcher(interval)
+
     # Sync app commands ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
     logger.info("♻️ Syncing app commands...")
     try:
-        await bot.tree.sync()
+        await bot.tree.set_translator(I18NTranslator())
+        if await sync_app_commands(bot):
+            logger.info("✅ App commands synced")
+        else:
+            logger.info("✅ App commands unchanged since the last sync")
     except discord.DiscordException as e:
         logger.error("⚠️ Error while syncing app commands: %s", repr(e))
-    else:
-        logger.info("✅ App commands synced")
 
     print("--------------------------------------------------------------------------------")
 
     await bot.change_presence(status=discord.Status.online)
     await asyncio.sleep(2)
 
+async def sync_app_commands(bot: Bot) -> bool:
+    """Sync the global app commands, unless their localized payload is the same as the last
+    synced one. The translator caches the localizations, so the sync reuses them
+
+    :return: True if the commands were synced
+    """
+    translator = bot.tree.translator
+    payload = [
+        await command.get_translated_payload(translator) if translator else command.to_dict()
+        for command in bot.tree.get_commands()
+    ]
+    digest = hashlib.sha256(
+        json.dumps([bot.application_id, payload], sort_keys=True).encode()
+    ).hexdigest()
+    try:
+        with open(APP_COMMANDS_HASH_PATH, "r", encoding="utf8") as file:
+            if file.read() == digest:
+                return False
+    except FileNotFoundError:
+        pass
+    await bot.tree.sync()
+    os.makedirs(os.path.dirname(APP_COMMANDS_HASH_PATH), exist_ok=True)
+    with open(APP_COMMANDS_HASH_PATH, "w", encoding="utf8") as file:
+        file.write(digest)
+    return True
+
 async def load_builtins(bot: Bot):
     "Load builtins modules"
     loaded = 0
@@ -2,10 +2,16 @@ from allay.core.src import bot_config
 from allay.core.src import database
 from allay.core.src import discord
 from allay.core.src import i18n
+from allay.core.src import i18n_catalog
+from allay.core.src import migrations
+from allay.core.src import query_stats
 
 __all__ = [
     "bot_config",
     "database",
     "discord",
     "i18n",
+    "i18n_catalog",
+    "migrations",
+    "query_stats",
 ]
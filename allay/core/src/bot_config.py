@@ -28,6 +28,8 @@ from LRFutils import color
 accept = ("y", "yes", "yeah", "ye")
 decline = ("n", "no", "nope", "nah")
 
+_MISSING = object()
+
 class BotConfig:
     "Handle the bot general configuration"
 
@@ -108,12 +110,18 @@ class BotConfig:
     # Accessor ----------------------------------------------------------------
 
     @staticmethod
-    def get(config: str) -> Any:
-        "Get the config value from a given configuration path"
+    def get(config: str, default: Any = _MISSING) -> Any:
+        """Get the config value from a given configuration path
+        If a default value is given, it is returned when the path doesn't exist"""
         path = config.split(".")
         conf = BotConfig.__global_config
-        for i in path:
-            conf = conf[i]
+        try:
+            for i in path:
+                conf = conf[i]
+        except (KeyError, TypeError):
+            if default is _MISSING:
+                raise
+            return default
         return conf
 
     #==============================================================================
@@ -3,11 +3,89 @@
 # Requirements
 #================================================================================
 
+import asyncio
+import functools
+import itertools
+import logging
 import os
+import queue
+import re
 import sqlite3
-from typing import Literal, Optional, Union, overload
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import AbstractContextManager, asynccontextmanager, contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import (
+    Any, AsyncIterator, Iterable, Iterator, Literal, NamedTuple, Optional, Union, overload
+)
 
 import allay
+from allay.core.src.migrations import migrate
+from allay.core.src.query_stats import QueryStats
+
+logger = logging.getLogger(__name__)
+
+#==============================================================================
+# Statements
+#==============================================================================
+
+class Statement(NamedTuple):
+    "Properties of a SQL statement that drive how its result is handled"
+    kind: str # first keyword of the statement (SELECT, INSERT, WITH...)
+    returns_rows: bool
+    writes: bool
+    normalized: str # query without literal values, used to group statistics
+
+_IGNORED_PREFIX = re.compile(r"(?:\s+|--[^\n]*|/\*.*?\*/)*", re.DOTALL)
+_KEYWORD = re.compile(r"[A-Za-z]*")
+# literals, quoted identifiers and comments are matched as a whole, so words inside them are
+# never taken for keywords
+_TOKEN = re.compile(
+    r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?(?:\*/|$)"
+    r"|(?P<word>[A-Za-z_]\w*)|(?P<paren>[()])",
+    re.DOTALL,
+)
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+_READ_KINDS = ("SELECT", "VALUES", "EXPLAIN", "PRAGMA")
+_WRITE_KINDS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+@functools.lru_cache(maxsize=1024)
+def parse_statement(query: str) -> Statement:
+    "Classify a SQL statement. Results are cached by query text"
+    start = _IGNORED_PREFIX.match(query).end() # type: ignore
+    kind = _KEYWORD.match(query, start).group().upper() # type: ignore
+    normalized = _SPACES.sub(" ", _LITERAL.sub("?", query[start:])).strip()
+    if kind in _READ_KINDS:
+        return Statement(kind, returns_rows=True, writes=False, normalized=normalized)
+    if kind == "WITH" or kind in _WRITE_KINDS:
+        # a CTE can prefix a SELECT as well as a write statement
+        main_kind, returning = _main_statement(query, start)
+        writes = main_kind not in _READ_KINDS
+        returns_rows = not writes or returning
+        return Statement(kind, returns_rows=returns_rows, writes=writes, normalized=normalized)
+    # schema changes, transactions control, etc.
+    return Statement(kind, returns_rows=False, writes=True, normalized=normalized)
+
+def _main_statement(query: str, start: int) -> tuple[str, bool]:
+    """Get the first keyword of the main statement, after the common table expressions, and
+    whether this statement has a RETURNING clause"""
+    depth = 0
+    main_kind = ""
+    for token in _TOKEN.finditer(query, start):
+        if (paren := token.group("paren")) is not None:
+            depth += 1 if paren == "(" else -1
+        elif depth == 0 and (word := token.group("word")) is not None:
+            word = word.upper()
+            if not main_kind:
+                if word in _READ_KINDS or word in _WRITE_KINDS:
+                    main_kind = word
+            elif word == "RETURNING":
+                return main_kind, True
+    return main_kind, False
 
 #==============================================================================
 # Database
@@ -22,34 +100,113 @@ class Database:
     if not os.path.isdir("data"):
         os.mkdir("data")
 
-    database = sqlite3.connect("data/database.db")
+    PATH = "data/database.db"
+
+    # The connection is shared between the event loop and the database worker thread, every
+    # access to it has to hold the lock
+    database = sqlite3.connect(PATH, check_same_thread=False)
+    _lock = threading.RLock()
+
+    # Single worker thread: queries sent through the async API are run one after another, in
+    # the order they were submitted
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="allay-database")
+
+    # Transactions
+    _transaction_depth = 0
+    _atransaction_lock = asyncio.Lock()
+    _in_atransaction: ContextVar[bool] = ContextVar("in_atransaction", default=False)
+    # (event loop thread, worker thread) of the open async transaction. Other threads wait for
+    # it to end before writing
+    _atransaction_threads: Optional[tuple[int, int]] = None
+    _atransaction_ended = threading.Condition(_lock)
+    # (query, arguments, executemany) of the sync writes of other event loop tasks, which can't
+    # wait and join the async transaction: they are run again if it is rolled back. Writes
+    # committed right away (statements outside of any sqlite transaction) aren't kept
+    _joined_writes: list[tuple[str, Any, bool]] = []
+
+    # Group commit: writes issued within the window are committed together
+    group_commit_window: float = 0
+    group_commit_sizes: Counter[int] = Counter() # number of commits by count of absorbed writes
+    _pending_writes = 0
+    _group_commit_timer: Optional[threading.Timer] = None
+
+    # WAL mode: reads are run on a pool of read-only connections, in parallel of the writer.
+    # Connections are never waited for: when they are all busy, reads use the writer
+    _readers: Optional[queue.LifoQueue[sqlite3.Connection]] = None
+    _reader_executor: Optional[ThreadPoolExecutor] = None
 
     # Load --------------------------------------------------------------------
 
     @staticmethod
     def load():
-        "Load model files from installed plugins and builtins"
-        cursor = Database.database.cursor()
-
-        # Core
-        with open("allay/core/data/model.sql", "r", encoding="utf-8") as file:
-            cursor.executescript(file.read())
-
-        # Builtins
-        for builtin in allay.builtins.all_modules:
-            model = os.path.join(allay.builtins.PATH, builtin, "data/model.sql")
-            if os.path.isfile(model):
-                with open(model, "r", encoding="utf-8") as file:
-                    cursor.executescript(file.read())
-
-        # Plugins
-        for plugin in allay.plugins.all_modules:
-            model = os.path.join(allay.plugins.PATH, plugin, "data/model.sql")
-            if os.path.isfile(model):
-                with open(model, "r", encoding="utf-8") as file:
-                    cursor.executescript(file.read())
+        "Apply the pending schema migrations of the core, installed builtins and plugins"
+        Database.group_commit_window = float(
+            allay.BotConfig.get("core.database.group_commit", 0) or 0
+        )
+        QueryStats.enabled = bool(allay.BotConfig.get("core.database.stats", True))
+        QueryStats.slow_query_threshold = float(
+            allay.BotConfig.get("core.database.slow_query", 0.1) or 0
+        )
 
-        cursor.close()
+        Database.connect()
+
+        modules = [("core", "allay/core")]
+        modules += [
+            ("builtins." + builtin, os.path.join(allay.builtins.PATH, builtin))
+            for builtin in allay.builtins.all_modules
+        ]
+        modules += [
+            ("plugins." + plugin, os.path.join(allay.plugins.PATH, plugin))
+            for plugin in allay.plugins.all_modules
+        ]
+        with Database._lock:
+            migrate(Database.database, modules)
+
+    @staticmethod
+    def connect():
+        """Open the database connections with the options from the bot config
+
+        In WAL mode, the pragmas from the config are applied and a pool of read-only connections
+        is opened"""
+        cached_statements = int(allay.BotConfig.get("core.database.cached_statements", 256))
+        with Database._lock:
+            Database.database.close()
+            Database.database = sqlite3.connect(
+                Database.PATH, check_same_thread=False, cached_statements=cached_statements
+            )
+
+        if not allay.BotConfig.get("core.database.wal", False):
+            return
+
+        synchronous = str(allay.BotConfig.get("core.database.synchronous", "NORMAL")).upper()
+        if synchronous not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError(f"Invalid synchronous mode for the database: {synchronous}")
+        pragmas = (
+            f"PRAGMA mmap_size={int(allay.BotConfig.get('core.database.mmap_size', 268435456))};"
+            f"PRAGMA cache_size={int(allay.BotConfig.get('core.database.cache_size', -65536))};"
+        )
+        Database.database.execute("PRAGMA journal_mode=WAL")
+        Database.database.execute(f"PRAGMA synchronous={synchronous}")
+        Database.database.executescript(pragmas)
+
+        readers = max(1, int(allay.BotConfig.get("core.database.readers", 4)))
+        Database._readers = queue.LifoQueue(maxsize=readers)
+        for _ in range(readers):
+            connection = sqlite3.connect(
+                f"file:{Database.PATH}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+                cached_statements=cached_statements,
+            )
+            connection.row_factory = sqlite3.Row
+            connection.executescript(pragmas)
+            Database._readers.put(connection)
+        Database._reader_executor = ThreadPoolExecutor(
+            max_workers=readers, thread_name_prefix="allay-database-reader"
+        )
+        logger.info("Database in WAL mode with %d read-only connections", readers)
+
+    # Query -------------------------------------------------------------------
 
     @overload # fetch one row as tuple
     @staticmethod
@@ -111,7 +268,8 @@ class Database:
         """
         Query the bot's database
 
-        If SELECT, returns a list of results, or only the first result (if fetchone)
+        If SELECT (or any query returning rows: PRAGMA, WITH, RETURNING clause...), returns a list
+            of results, or only the first result (if fetchone)
         For all other queries, returns the ID of the affected row, or the number of affected rows
             (if returnrowscount)
 
@@ -124,18 +282,56 @@ class Database:
         :return: The result of the query
         """
 
-        cursor = Database.database.cursor()
+        statement = parse_statement(query)
+        if Database._use_reader(statement):
+            with Database._reader() as connection:
+                if connection is not None:
+                    return Database._query(
+                        connection, statement, query, args, fetchone, returnrowcount, astuple
+                    )
+        with Database._lock:
+            joined = statement.writes and Database._wait_atransaction()
+            result = Database._query(
+                Database.database, statement, query, args, fetchone, returnrowcount, astuple
+            )
+            if joined and Database.database.in_transaction:
+                Database._joined_writes.append((query, args, False))
+            return result
+
+    @staticmethod
+    def _query(
+        connection: sqlite3.Connection,
+        statement: Statement,
+        query: str,
+        args: Optional[Union[tuple, dict]],
+        fetchone: bool,
+        returnrowcount: bool,
+        astuple: bool,
+    ) -> Union[int, list[dict], list[tuple], dict, tuple]:
+        """Run a query on the given connection.
+        The caller must hold the lock if it is the shared connection"""
+        start = time.perf_counter()
+        cursor = connection.cursor()
         try:
             cursor.execute(query, args or [])
-            if query.startswith("SELECT") or query.startswith("PRAGMA"):
+            if statement.returns_rows:
                 _type = tuple if astuple else dict
-                if fetchone:
+                if fetchone and not statement.writes:
                     row = cursor.fetchone()
-                    result = _type() if row is None else _type(row)
+                    rows = [] if row is None else [row]
+                else:
+                    rows = cursor.fetchall()
+                if statement.writes:
+                    # rows of a RETURNING clause have to be read before the commit
+                    Database._commit_write()
+                if fetchone:
+                    result = _type(rows[0]) if rows else _type()
                 else:
-                    result = list(map(_type, cursor.fetchall()))
+                    result = list(map(_type, rows))
+                rowcount = len(rows)
             else:
-                Database.database.commit()
+                Database._commit_write()
+                rowcount = max(cursor.rowcount, 0)
                 if returnrowcount:
                     result = cursor.rowcount
                 else:
@@ -144,4 +340,565 @@ class Database:
             cursor.close()
             raise exception
         cursor.close()
+        if QueryStats.enabled:
+            Database._record(connection, statement, query, args, start, rowcount)
         return result
+
+    @staticmethod
+    def _record(
+        connection: sqlite3.Connection,
+        statement: Statement,
+        query: str,
+        args: Optional[Union[tuple, dict]],
+        start: float,
+        rowcount: int,
+    ):
+        """Add a query to the statistics, and log it with its query plan if it is slow.
+        The caller must hold the lock if it is the shared connection"""
+        duration = time.perf_counter() - start
+        QueryStats.record(statement.normalized, duration, rowcount)
+        if not QueryStats.is_slow(duration):
+            return
+        try:
+            plan = "\n".join(
+                f"  {row[3]}"
+                for row in connection.execute("EXPLAIN QUERY PLAN " + query, args or [])
+            )
+        except sqlite3.Error as exception:
+            plan = f"  (no query plan: {exception})"
+        logger.warning(
+            "Slow query (%.1f ms): %s\n%s", duration * 1000, statement.normalized, plan
+        )
+
+    @staticmethod
+    def query_many(
+        query: str,
+        rows: Iterable[Union[tuple, dict]],
+        *,
+        chunk_size: int = 1000,
+    ) -> int:
+        """
+        Run a query once for every set of arguments, inside a single transaction
+
+        Arguments are consumed lazily and sent to sqlite by chunks through `executemany`, so
+        generators can be used to insert a large amount of rows without loading them in memory.
+
+        :param query: The query to be performed
+        :param rows: An iterable of query arguments
+        :param chunk_size: The number of arguments sent to sqlite at once
+        :return: The total number of affected rows
+        """
+        start = time.perf_counter()
+        rowcount = 0
+        rows = iter(rows)
+        with Database.transaction():
+            joined = Database._wait_atransaction()
+            cursor = Database.database.cursor()
+            try:
+                while chunk := list(itertools.islice(rows, chunk_size)):
+                    cursor.executemany(query, chunk)
+                    rowcount += cursor.rowcount
+                    if joined:
+                        Database._joined_writes.append((query, chunk, True))
+            finally:
+                cursor.close()
+        if QueryStats.enabled:
+            QueryStats.record(
+                parse_statement(query).normalized, time.perf_counter() - start, rowcount
+            )
+        return rowcount
+
+    # Iteration ---------------------------------------------------------------
+
+    @staticmethod
+    def iterate(
+        query: str,
+        args: Optional[Union[tuple, dict]] = None,
+        *,
+        chunk_size: int = 500,
+        astuple: bool = False,
+    ) -> Iterator[Union[tuple, sqlite3.Row]]:
+        """
+        Iterate over the rows of a SELECT query without loading the whole result in memory
+
+        Rows are fetched from sqlite by chunks, so the memory usage doesn't depend on the size of
+        the result.
+
+        :param query: The query to be performed
+        :param args: The query arguments
+        :param chunk_size: The number of rows fetched from sqlite at once
+        :param astuple: Yield rows as tuples instead of sqlite3.Row objects
+        :return: An iterator over the rows
+        """
+        statement = Database._iterable_statement(query)
+        if Database._use_reader(statement):
+            with Database._reader() as connection:
+                if connection is not None:
+                    yield from Database._iterate(
+                        connection, nullcontext(), query, args, chunk_size, astuple
+                    )
+                    return
+        yield from Database._iterate(
+            Database.database, Database._lock, query, args, chunk_size, astuple
+        )
+
+    @staticmethod
+    def _iterate(
+        connection: sqlite3.Connection,
+        lock: AbstractContextManager,
+        query: str,
+        args: Optional[Union[tuple, dict]],
+        chunk_size: int,
+        astuple: bool,
+    ) -> Iterator[Union[tuple, sqlite3.Row]]:
+        "Iterate over the rows of a query, holding the lock only while fetching a chunk"
+        cursor = Database._open_cursor(connection, lock, query, args, astuple)
+        try:
+            while rows := Database._fetch_chunk(cursor, lock, chunk_size):
+                yield from rows
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _iterable_statement(query: str) -> Statement:
+        "Parse a statement and check that its rows can be iterated"
+        statement = parse_statement(query)
+        if not statement.returns_rows or statement.writes:
+            raise ValueError("Only read-only queries returning rows can be iterated")
+        return statement
+
+    @staticmethod
+    def _open_cursor(
+        connection: sqlite3.Connection,
+        lock: AbstractContextManager,
+        query: str,
+        args: Optional[Union[tuple, dict]],
+        astuple: bool,
+    ) -> sqlite3.Cursor:
+        "Execute a query on a new cursor"
+        with lock:
+            cursor = connection.cursor()
+            cursor.row_factory = None if astuple else sqlite3.Row
+            try:
+                cursor.execute(query, args or [])
+            except Exception as exception:
+                cursor.close()
+                raise exception
+        return cursor
+
+    @staticmethod
+    def _fetch_chunk(
+        cursor: sqlite3.Cursor, lock: AbstractContextManager, chunk_size: int
+    ) -> list[Union[tuple, sqlite3.Row]]:
+        "Fetch the next rows of a cursor"
+        with lock:
+            return cursor.fetchmany(chunk_size)
+
+    # Readers -----------------------------------------------------------------
+
+    @staticmethod
+    def _use_reader(statement: Statement) -> bool:
+        """Check if a statement can run on a read-only connection
+        Reads go to the writer while some writes are not committed, so they can be seen"""
+        return (
+            Database._readers is not None
+            and not statement.writes
+            and statement.kind != "PRAGMA" # pragmas are specific to each connection
+            and Database._transaction_depth == 0
+            and Database._pending_writes == 0
+        )
+
+    @staticmethod
+    def _take_reader() -> Optional[sqlite3.Connection]:
+        """Take an idle read-only connection from the pool, or None if they are all busy
+        Never waits, as a busy connection may only be given back by the waiting thread"""
+        try:
+            return Database._readers.get_nowait() # type: ignore
+        except queue.Empty:
+            return None
+
+    @staticmethod
+    def _give_back_reader(connection: sqlite3.Connection):
+        "Give a read-only connection back to the pool"
+        Database._readers.put_nowait(connection) # type: ignore
+
+    @staticmethod
+    @contextmanager
+    def _reader() -> Iterator[Optional[sqlite3.Connection]]:
+        "Borrow an idle read-only connection from the pool, or None if they are all busy"
+        connection = Database._take_reader()
+        try:
+            yield connection
+        finally:
+            if connection is not None:
+                Database._give_back_reader(connection)
+
+    # Transactions ------------------------------------------------------------
+
+    @staticmethod
+    @contextmanager
+    def transaction():
+        """
+        Run every query of the block in a single transaction
+
+        The transaction is committed once at the end of the block, or rolled back if an exception
+        is raised. Nested transactions are merged into the outermost one.
+        Other threads wait for the block to end before accessing the database, so the block must
+        not await anything relying on the database worker (use `Database.atransaction` instead).
+        """
+        with Database._lock:
+            if Database._wait_atransaction():
+                with Database._joined_transaction():
+                    yield
+                return
+            Database._begin()
+            try:
+                yield
+            except BaseException:
+                Database._end(commit=False)
+                raise
+            Database._end(commit=True)
+
+    @staticmethod
+    @asynccontextmanager
+    async def atransaction():
+        """
+        Run every `Database.aquery` of the block in a single transaction
+
+        The transaction is committed once at the end of the block, or rolled back if an exception
+        is raised. Async queries made outside of the block wait for the transaction to end, and so
+        do sync writes from other threads. Sync writes from other tasks of the event loop can't
+        wait: they are run in the transaction, and run again if it is rolled back.
+        Nested transactions are merged into the outermost one.
+        """
+        if Database._in_atransaction.get():
+            yield
+            return
+        async with Database._atransaction_lock:
+            token = Database._in_atransaction.set(True)
+            try:
+                await Database._run(Database._begin_async, threading.get_ident())
+                try:
+                    yield
+                except BaseException:
+                    await Database._run(Database._end_async, commit=False)
+                    raise
+                await Database._run(Database._end_async, commit=True)
+            finally:
+                Database._in_atransaction.reset(token)
+
+    @staticmethod
+    def flush():
+        "Commit the writes waiting for a group commit"
+        with Database._lock:
+            if Database._group_commit_timer is not None:
+                Database._group_commit_timer.cancel()
+                Database._group_commit_timer = None
+            if Database._pending_writes > 0 and Database._transaction_depth == 0:
+                Database._commit()
+
+    @staticmethod
+    def _begin():
+        "Open a transaction, or join the current one"
+        with Database._lock:
+            if Database._transaction_depth == 0 and Database._pending_writes > 0:
+                # don't let a rollback discard writes that were already acknowledged
+                Database._commit()
+            Database._transaction_depth += 1
+
+    @staticmethod
+    def _begin_async(loop_thread: int):
+        "Open the async transaction. Run on the worker thread"
+        with Database._lock:
+            Database._begin()
+            Database._atransaction_threads = (loop_thread, threading.get_ident())
+
+    @staticmethod
+    def _end_async(commit: bool):
+        "Close the async transaction, and wake up the threads waiting for it. Run on the worker"
+        with Database._lock:
+            Database._atransaction_threads = None
+            joined_writes, Database._joined_writes = Database._joined_writes, []
+            try:
+                Database._end(commit)
+                if not commit and joined_writes:
+                    Database._replay(joined_writes)
+            finally:
+                Database._atransaction_ended.notify_all()
+
+    @staticmethod
+    def _wait_atransaction() -> bool:
+        """Wait for the open async transaction to end, so a write doesn't join it by accident.
+        The caller must hold the lock
+
+        :return: True if the write joins the transaction anyway, because it comes from another
+            task of the event loop running it, which would never end while we wait
+        """
+        while (threads := Database._atransaction_threads) is not None:
+            if threading.get_ident() == threads[1]:
+                return False
+            if threading.get_ident() == threads[0]:
+                # the task running the transaction joins it on purpose
+                return not Database._in_atransaction.get()
+            Database._atransaction_ended.wait()
+        return False
+
+    @staticmethod
+    @contextmanager
+    def _joined_transaction():
+        """Run a sync transaction block of another event loop task inside the async transaction,
+        in a savepoint, so an exception only rolls back the writes of the block.
+        The caller must hold the lock"""
+        if not Database.database.in_transaction:
+            Database.database.execute("BEGIN")
+        Database.database.execute("SAVEPOINT joined_transaction")
+        joined_writes = len(Database._joined_writes)
+        try:
+            yield
+        except BaseException:
+            Database.database.execute("ROLLBACK TO joined_transaction")
+            Database.database.execute("RELEASE joined_transaction")
+            del Database._joined_writes[joined_writes:]
+            raise
+        Database.database.execute("RELEASE joined_transaction")
+
+    @staticmethod
+    def _replay(joined_writes: list[tuple[str, Any, bool]]):
+        """Run again the writes of other tasks rolled back with the async transaction they
+        joined. The caller must hold the lock"""
+        try:
+            with Database.transaction():
+                for query, args, many in joined_writes:
+                    if many:
+                        Database.database.executemany(query, args)
+                    else:
+                        Database.database.execute(query, args or [])
+        except sqlite3.Error:
+            logger.exception(
+                "Unable to run again %d writes rolled back with an async transaction",
+                len(joined_writes),
+            )
+
+    @staticmethod
+    def _end(commit: bool):
+        "Leave a transaction, and commit or rollback it if it was the outermost one"
+        with Database._lock:
+            Database._transaction_depth -= 1
+            if Database._transaction_depth > 0:
+                return
+            if commit:
+                Database._commit()
+            else:
+                Database.database.rollback()
+
+    @staticmethod
+    def _commit_write():
+        """Commit a write, unless it is part of a transaction or merged into a group commit.
+        The caller must hold the lock"""
+        if Database._transaction_depth > 0:
+            return
+        if Database.group_commit_window <= 0:
+            Database.database.commit()
+            return
+        Database._pending_writes += 1
+        if Database._group_commit_timer is None:
+            Database._group_commit_timer = threading.Timer(
+                Database.group_commit_window, Database.flush
+            )
+            Database._group_commit_timer.daemon = True
+            Database._group_commit_timer.start()
+
+    @staticmethod
+    def _commit():
+        "Commit the current transaction. The caller must hold the lock"
+        Database.database.commit()
+        if Database._pending_writes > 0:
+            Database.group_commit_sizes[Database._pending_writes] += 1
+            logger.debug("Group commit absorbed %d writes", Database._pending_writes)
+            Database._pending_writes = 0
+
+    # Async API ---------------------------------------------------------------
+
+    @overload # fetch one row as tuple
+    @staticmethod
+    async def aquery(
+        query: str,
+        args: Optional[Union[tuple, dict]] = None,
+        *,
+        fetchone: Literal[True],
+        returnrowcount: bool = False,
+        astuple: Literal[True],
+    ) -> tuple:
+        ...
+
+    @overload # fetch one row as dict
+    @staticmethod
+    async def aquery(
+        query: str,
+        args: Optional[Union[tuple, dict]] = None,
+        *,
+        fetchone: Literal[True],
+        returnrowcount: bool = False,
+        astuple: Literal[False],
+    ) -> dict:
+        ...
+
+    @overload # fetch all rows as tuple
+    @staticmethod
+    async def aquery(
+        query: str,
+        args: Optional[Union[tuple, dict]] = None,
+        *,
+        fetchone: bool = False,
+        returnrowcount: bool = False,
+        astuple: Literal[True] = True,
+    ) -> list[tuple]:
+        ...
+
+    @overload # fetch all rows as dict
+    @staticmethod
+    async def aquery(
+        query: str,
+        args: Optional[Union[tuple, dict]] = None,
+        *,
+        fetchone: bool = False,
+        returnrowcount: bool = False,
+        astuple: Literal[False] = False,
+    ) -> list[dict]:
+        ...
+
+    @staticmethod
+    async def aquery(
+        query: str,
+        args: Optional[Union[tuple, dict]] = None,
+        *,
+        fetchone: bool = False,
+        returnrowcount: bool = False,
+        astuple: bool = False,
+    ) -> Union[int, list[dict], list[tuple], dict, tuple]:
+        """
+        Query the bot's database without blocking the event loop
+
+        Same behavior as `Database.query`, but the query is run on the database worker thread.
+        Queries are executed in the order they were awaited.
+
+        :param query: The query to be performed
+        :param args: The query arguments
+        :param fetchone: If the query is a SELECT, returns only the first result
+        :param returnrowcount: If the query is an INSERT, UPDATE or DELETE, returns the number of
+            of affected rows
+        :param astuple: If the query is a SELECT, returns the results as a tuple instead of a dict
+        :return: The result of the query
+        """
+        await Database._wait_transaction()
+        statement = parse_statement(query)
+        if Database._use_reader(statement) and not Database._in_atransaction.get():
+            # reads are run in parallel on the reader threads. The connection is taken here, so
+            # a reader thread never has to wait for one
+            if (connection := Database._take_reader()) is not None:
+                future = Database._reader_executor.submit( # type: ignore
+                    Database._query,
+                    connection, statement, query, args, fetchone, returnrowcount, astuple
+                )
+                future.add_done_callback(lambda _: Database._give_back_reader(connection))
+                return await asyncio.wrap_future(future)
+        return await Database._run(
+            Database.query,
+            query,
+            args,
+            fetchone=fetchone,
+            returnrowcount=returnrowcount,
+            astuple=astuple,
+        )
+
+    @staticmethod
+    async def aquery_many(
+        query: str,
+        rows: Iterable[Union[tuple, dict]],
+        *,
+        chunk_size: int = 1000,
+    ) -> int:
+        """
+        Run a query once for every set of arguments without blocking the event loop
+
+        Same behavior as `Database.query_many`, but the rows are consumed on the database worker
+        thread.
+
+        :param query: The query to be performed
+        :param rows: An iterable of query arguments
+        :param chunk_size: The number of arguments sent to sqlite at once
+        :return: The total number of affected rows
+        """
+        await Database._wait_transaction()
+        return await Database._run(Database.query_many, query, rows, chunk_size=chunk_size)
+
+    @staticmethod
+    async def aiterate(
+        query: str,
+        args: Optional[Union[tuple, dict]] = None,
+        *,
+        chunk_size: int = 500,
+        astuple: bool = False,
+    ) -> AsyncIterator[Union[tuple, sqlite3.Row]]:
+        """
+        Iterate over the rows of a SELECT query without blocking the event loop
+
+        Same behavior as `Database.iterate`, but every chunk is fetched on a database thread.
+
+        :param query: The query to be performed
+        :param args: The query arguments
+        :param chunk_size: The number of rows fetched from sqlite at once
+        :param astuple: Yield rows as tuples instead of sqlite3.Row objects
+        :return: An async iterator over the rows
+        """
+        statement = Database._iterable_statement(query)
+        await Database._wait_transaction()
+        connection = None
+        if Database._use_reader(statement) and not Database._in_atransaction.get():
+            connection = Database._take_reader()
+        if connection is not None:
+            executor = Database._reader_executor
+            lock: AbstractContextManager = nullcontext()
+        else:
+            executor = Database._executor
+            connection = Database.database
+            lock = Database._lock
+        opened = future = executor.submit( # type: ignore
+            Database._open_cursor, connection, lock, query, args, astuple
+        )
+        try:
+            cursor = await asyncio.wrap_future(opened)
+            while True:
+                future = executor.submit( # type: ignore
+                    Database._fetch_chunk, cursor, lock, chunk_size
+                )
+                if not (rows := await asyncio.wrap_future(future)):
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            # if the iteration was cancelled, the last job may still be using the cursor
+            future.add_done_callback(lambda _: Database._end_iteration(opened, connection))
+
+    @staticmethod
+    def _end_iteration(opened: Future, connection: sqlite3.Connection):
+        "Close the cursor of an async iteration, and give its connection back to the pool"
+        if not opened.cancelled() and opened.exception() is None:
+            opened.result().close()
+        if connection is not Database.database:
+            Database._give_back_reader(connection)
+
+    @staticmethod
+    async def _wait_transaction():
+        "Wait for the running async transaction to end, unless we are part of it"
+        while Database._atransaction_lock.locked() and not Database._in_atransaction.get():
+            async with Database._atransaction_lock:
+                pass
+
+    @staticmethod
+    async def _run(function, *args, **kwargs):
+        "Run a function on the database worker thread and wait for its result"
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            Database._executor, functools.partial(function, *args, **kwargs)
+        )
@@ -2,10 +2,12 @@ from . import utils
 from .bot import Bot
 from .context import Context
 from .guild_config import GuildConfig
+from .translator import I18NTranslator
 
 __all__ = [
     "utils",
     "Bot",
     "Context",
     "GuildConfig",
+    "I18NTranslator",
 ]
@@ -21,7 +21,9 @@ if TYPE_CHECKING:
 
 # Project modules -------------------------------------------------------------
 
+from allay.core.src.database import Database
 from allay.core.src.discord.context import Context
+from allay.core.src.i18n import I18N
 
 #==============================================================================
 # Bot class
@@ -54,8 +56,34 @@ class Bot(commands.bot.AutoShardedBot):
         self.cog_display_names: dict[str, Optional[str]] = {}
         self.app_commands_list: Optional[list[discord.app_commands.AppCommand]] = None
 
+        # keep the memoized guild locales up to date
+        self.add_listener(self._forget_guild_locale, "on_guild_join")
+        self.add_listener(self._forget_guild_locale, "on_guild_remove")
+        self.add_listener(self._on_guild_update, "on_guild_update")
+
         Bot.instances.append(self)
 
+    async def _forget_guild_locale(self, guild: discord.Guild):
+        I18N.invalidate_guild_locale(guild.id)
+
+    async def _on_guild_update(self, before: discord.Guild, after: discord.Guild):
+        if before.preferred_locale != after.preferred_locale:
+            I18N.invalidate_guild_locale(after.id)
+
+    # Shutdown ----------------------------------------------------------------
+
+    async def close(self):
+        "Close the connection to Discord, then save the pending data of the cogs and database"
+        await super().close()
+        for module in self.cogs.values():
+            if hasattr(module, "on_bot_close"):
+                try:
+                    module.on_bot_close() # type: ignore
+                # pylint: disable=broad-exception-caught
+                except BaseException as err:
+                    logger.error(f"Error while calling on_bot_close: {err}")
+        Database.flush()
+
     # Context -----------------------------------------------------------------
 
     # pylint: disable=arguments-differ
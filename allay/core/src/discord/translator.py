@@ -0,0 +1,85 @@
+"""
+Ce programme est régi par la licence CeCILL soumise au droit français et
+respectant les principes de diffusion des logiciels libres. Vous pouvez
+utiliser, modifier et/ou redistribuer ce programme sous les conditions
+de la licence CeCILL diffusée sur le site "http://www.cecill.info".
+"""
+
+#==============================================================================
+# Requirements
+#==============================================================================
+
+from typing import Optional
+
+import discord
+from discord import app_commands
+from discord.app_commands import TranslationContextLocation as Location
+
+from allay.core.src import i18n
+from allay.core.src.i18n_catalog import render
+
+#==============================================================================
+# Translator
+#==============================================================================
+
+class I18NTranslator(app_commands.Translator):
+    """Localize the app commands with the translations of the lang files
+
+    The key of a string is the `key` extra of its locale_str if given, else it is built from
+    the command it belongs to, for example:
+    - `app_commands.<command>.name` and `app_commands.<command>.description`
+    - `app_commands.<command>.params.<parameter>.name` (and `.description`)
+    - `app_commands.choices.<choice>` and `app_commands.<string>` for the other strings
+
+    Subcommands use their qualified name with dots, like `app_commands.config.show.name`.
+    Localizations are computed once per string and locale, and kept until the lang files are
+    reloaded, so syncing the tree again doesn't translate anything"""
+
+    def __init__(self):
+        # (key, locale) -> localized string, or None when it has no translation
+        self._cache: dict[tuple[str, str], Optional[str]] = {}
+        self._catalog_version = i18n.catalog.version
+
+    async def translate(
+        self,
+        string: app_commands.locale_str,
+        locale: discord.Locale,
+        context: app_commands.TranslationContext,
+    ) -> Optional[str]:
+        if self._catalog_version != i18n.catalog.version:
+            self._cache.clear()
+            self._catalog_version = i18n.catalog.version
+        key = string.extras.get("key") or get_key(string.message, context)
+        if (key, locale.value) not in self._cache:
+            self._cache[(key, locale.value)] = self.lookup(key, locale)
+        return self._cache[(key, locale.value)]
+
+    @staticmethod
+    def lookup(key: str, locale: discord.Locale) -> Optional[str]:
+        """Get the translation of a key in a locale (or its language, like fr for fr-FR),
+        without falling back to another language"""
+        locales = i18n.catalog.locales
+        table = locales.get(locale.value) or locales.get(locale.value.split("-")[0])
+        if table is None or (template := table.get(key)) is None:
+            return None
+        return render(template, {})
+
+
+def get_key(message: str, context: app_commands.TranslationContext) -> str:
+    "Build the translation key of an app command string from where it is used"
+    location, data = context.location, context.data
+    if location in (Location.command_name, Location.group_name):
+        return f"app_commands.{_path(data)}.name"
+    if location in (Location.command_description, Location.group_description):
+        return f"app_commands.{_path(data)}.description"
+    if location == Location.parameter_name:
+        return f"app_commands.{_path(data.command)}.params.{data.name}.name"
+    if location == Location.parameter_description:
+        return f"app_commands.{_path(data.command)}.params.{data.name}.description"
+    if location == Location.choice_name:
+        return f"app_commands.choices.{message}"
+    return f"app_commands.{message}"
+
+def _path(command) -> str:
+    "Dotted qualified name of a command, group or context menu"
+    return getattr(command, "qualified_name", command.name).replace(" ", ".")
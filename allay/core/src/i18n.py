@@ -9,13 +9,19 @@ de la licence CeCILL diffusée sur le site "http://www.cecill.info".
 # Requirements
 #==============================================================================
 
+import asyncio
+import logging
 import os
+from typing import Optional
 
 import discord
 import i18n
 from discord.ext import commands
 
 import allay
+from allay.core.src.i18n_catalog import TranslationCatalog
+
+logger = logging.getLogger(__name__)
 
 # I18N config -----------------------------------------------------------------
 
@@ -34,6 +40,13 @@ for plugin in allay.plugins.all_modules:
     if os.path.isdir(plugin_path):
         i18n.load_path.append(plugin_path)
 
+# Compile every translation once, with the fallback language already resolved
+# A snapshot of the compiled lang files avoids parsing the unchanged ones at startup
+SNAPSHOT_PATH = "data/translations.pickle"
+catalog = TranslationCatalog.from_paths(
+    i18n.load_path, fallback=i18n.get("fallback"), snapshot=SNAPSHOT_PATH
+)
+
 #==============================================================================
 # I18N class
 #==============================================================================
@@ -44,24 +57,94 @@ class I18N:
     CTX_TYPE = discord.abc.User | discord.Guild | discord.abc.GuildChannel | discord.Locale | \
         commands.Context | discord.Interaction | int
 
+    # background task reloading the edited lang files, see start_watcher
+    _watcher: Optional[asyncio.Task] = None
+
+    # guild_id -> resolved locale, see get_guild_locale
+    _guild_locales: dict[int, discord.Locale] = {}
+    _LOCALE_VALUES = frozenset(locale.value for locale in discord.Locale)
+
     @staticmethod
     def tr(ctx: CTX_TYPE, key: str, **kwargs): # pylint: disable=invalid-name
         "Translate a key to the context language"
-        return i18n.t(key, locale=str(I18N.get_locale(ctx)), **kwargs)
+        return catalog.translate(str(I18N.get_locale(ctx)), key, kwargs)
+
+    @staticmethod
+    def reload() -> list[str]:
+        """Reload the lang files edited since they were loaded, without restarting the bot
+
+        :return: The paths of the reloaded lang files
+        """
+        changed = catalog.reload()
+        if changed:
+            logger.info("Reloaded the lang files: %s", ", ".join(changed))
+        return changed
+
+    @staticmethod
+    def start_watcher(interval: float):
+        "Check for edited lang files every `interval` seconds, and reload them"
+        async def watch():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    I18N.reload()
+                except Exception: # pylint: disable=broad-except
+                    logger.exception("Unable to reload the lang files")
+        if I18N._watcher is None or I18N._watcher.done():
+            I18N._watcher = asyncio.create_task(watch())
 
     @staticmethod
     def get_locale(ctx: CTX_TYPE) -> discord.Locale:
         "Get the locale that should be used for a given context"
         if isinstance(ctx, discord.Locale):
             return ctx
+        if isinstance(ctx, int):
+            return I18N.get_guild_locale(ctx)
         if isinstance(ctx, discord.Guild):
-            return ctx.preferred_locale
+            return I18N.get_guild_locale(ctx.id, ctx.preferred_locale)
         try:
             return ctx.locale # type: ignore
         except AttributeError:
             pass
-        try:
-            return ctx.guild.preferred_locale # type: ignore
-        except AttributeError:
-            pass
+        if (guild := getattr(ctx, "guild", None)) is not None:
+            return I18N.get_guild_locale(guild.id, getattr(guild, "preferred_locale", None))
         return discord.Locale.american_english
+
+    @staticmethod
+    def get_guild_locale(
+        guild_id: int, default: Optional[discord.Locale] = None
+    ) -> discord.Locale:
+        """Get the locale of a guild: the language set in its configuration if any, else its
+        Discord preferred locale. Results are memoized until `invalidate_guild_locale` is called
+
+        :param default: Locale of a guild missing from the bot cache. American English if None
+        """
+        if (locale := I18N._guild_locales.get(guild_id)) is not None:
+            return locale
+        for bot in allay.Bot.instances:
+            if (guild := bot.get_guild(guild_id)) is not None:
+                locale = I18N._get_configured_locale(bot, guild_id) or guild.preferred_locale
+                I18N._guild_locales[guild_id] = locale
+                return locale
+        # unknown guild, not memoized as it may be cached later
+        return default or discord.Locale.american_english
+
+    @staticmethod
+    def invalidate_guild_locale(guild_id: Optional[int] = None):
+        "Forget the memoized locale of a guild, or of every guild"
+        if guild_id is None:
+            I18N._guild_locales.clear()
+        else:
+            I18N._guild_locales.pop(guild_id, None)
+
+    @staticmethod
+    def _get_configured_locale(bot: "allay.Bot", guild_id: int) -> Optional[discord.Locale]:
+        "Get the language option of a guild configuration, if the server config is loaded"
+        if bot.get_cog("ConfigCog") is None:
+            return None
+        if not (language := bot.server_configs[guild_id].get("language")):
+            return None
+        if language not in I18N._LOCALE_VALUES:
+            logger.warning("Invalid language %r in the config of the guild %s", language, guild_id)
+            return None
+        return discord.Locale(language)
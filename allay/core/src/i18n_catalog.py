@@ -0,0 +1,306 @@
+"""
+Ce programme est régi par la licence CeCILL soumise au droit français et
+respectant les principes de diffusion des logiciels libres. Vous pouvez
+utiliser, modifier et/ou redistribuer ce programme sous les conditions
+de la licence CeCILL diffusée sur le site "http://www.cecill.info".
+"""
+
+#==============================================================================
+# Requirements
+#==============================================================================
+
+import hashlib
+import logging
+import os
+import pickle
+from string import Template
+from typing import Any, Iterable, NamedTuple, Optional
+
+from i18n import I18nFileLoadError, config, resource_loader
+
+logger = logging.getLogger(__name__)
+
+#==============================================================================
+# Templates
+#==============================================================================
+
+PLURALS = ("zero", "one", "few", "many", "other")
+
+class _Template(Template):
+    "Same placeholder syntax as python-i18n: %{name}, %name, and %% for a literal %"
+    delimiter = "%"
+
+
+class CompiledTemplate:
+    """A translation split once into literal parts and placeholders
+
+    Rendering gives the same result as python-i18n's safe substitution: unknown placeholders
+    are left as they are"""
+
+    __slots__ = ("parts", "names", "format_string")
+
+    def __init__(self, text: str):
+        # literal strings and (placeholder name, original text) tuples
+        self.parts: list[str | tuple[str, str]] = []
+        position = 0
+        for match in _Template.pattern.finditer(text):
+            if match.start() > position:
+                self.parts.append(text[position:match.start()])
+            if match.group("escaped") is not None:
+                self.parts.append("%")
+            elif (name := match.group("named") or match.group("braced")) is not None:
+                self.parts.append((name, match.group()))
+            else:
+                self.parts.append(match.group())
+            position = match.end()
+        if position < len(text):
+            self.parts.append(text[position:])
+        self.names = frozenset(part[0] for part in self.parts if isinstance(part, tuple))
+        # str.format version, used when every placeholder has a value
+        self.format_string = "".join(
+            part.replace("{", "{{").replace("}", "}}") if isinstance(part, str)
+            else "{" + part[0] + "}"
+            for part in self.parts
+        )
+
+    def render(self, kwargs: dict[str, Any]) -> str:
+        "Replace the placeholders by the given values"
+        if self.names <= kwargs.keys():
+            return self.format_string.format_map(kwargs)
+        return "".join(
+            part if isinstance(part, str)
+            else str(kwargs[part[0]]) if part[0] in kwargs
+            else part[1]
+            for part in self.parts
+        )
+
+
+class PluralTemplate:
+    "A translation having several forms depending on a count, like python-i18n plurals"
+
+    __slots__ = ("key", "forms")
+
+    def __init__(self, key: str, forms: dict[str, Any]):
+        self.key = key
+        self.forms = {form: compile_template(key, value) for form, value in forms.items()}
+
+    def render(self, kwargs: dict[str, Any]) -> str:
+        "Render the form matching the 'count' value"
+        count = kwargs.get("count")
+        if count == 0:
+            names = ("zero", "other", "many")
+        elif count == 1:
+            names = ("one", "other", "many")
+        elif count is not None and count <= config.get("plural_few"):
+            names = ("few", "other", "many")
+        else:
+            names = ("other", "many")
+        for name in names:
+            if name in self.forms:
+                return render(self.forms[name], kwargs)
+        return self.key
+
+
+def compile_template(key: str, value: Any) -> "str | CompiledTemplate | PluralTemplate":
+    """Compile the translation value of a key
+    Strings without placeholder are kept as they are, as they don't need any rendering"""
+    if isinstance(value, dict):
+        return PluralTemplate(key, value)
+    text = str(value)
+    if "%" not in text:
+        return text
+    template = CompiledTemplate(text)
+    if all(isinstance(part, str) for part in template.parts):
+        return "".join(template.parts) # type: ignore
+    return template
+
+def render(template: "str | CompiledTemplate | PluralTemplate", kwargs: dict[str, Any]) -> str:
+    "Render a compiled translation"
+    if isinstance(template, str):
+        return template
+    return template.render(kwargs)
+
+#==============================================================================
+# Catalog
+#==============================================================================
+
+class LangFile(NamedTuple):
+    "The compiled translations of a lang file, with what identifies its version"
+    path: str
+    locale: str
+    mtime_ns: int
+    size: int
+    digest: str
+    translations: dict[str, Any]
+
+
+class TranslationCatalog:
+    """Flat (locale, key) -> compiled translation catalog, built from the lang files
+
+    Each locale table already contains the translations of the fallback locale, so translating
+    is a single dict lookup. Locales without any lang file use the fallback table
+
+    Compiled lang files can be saved in a snapshot file, so the next startups only parse the
+    lang files changed since then"""
+
+    SNAPSHOT_VERSION = 1
+
+    def __init__(self, fallback: str = "en"):
+        self.fallback = fallback
+        # folders of the lang files and snapshot path, used to reload them
+        self.paths: list[str] = []
+        self.snapshot: Optional[str] = None
+        # lang files by path, in loading order (later files override the previous ones)
+        self.files: dict[str, LangFile] = {}
+        # locale -> key -> compiled translation, from the lang files only
+        self.locales: dict[str, dict[str, Any]] = {}
+        # locale -> key -> compiled translation, including the fallback translations
+        self._resolved: dict[str, dict[str, Any]] = {}
+        # incremented each time the translations change, so caches built on them can expire
+        self.version = 0
+
+    @classmethod
+    def from_paths(
+        cls,
+        paths: Iterable[str],
+        fallback: str = "en",
+        snapshot: Optional[str] = None,
+    ) -> "TranslationCatalog":
+        """Build a catalog from the <locale>.yml files of some folders. Later folders win
+
+        :param snapshot: Path of the snapshot file, read and updated if given
+        """
+        catalog = cls(fallback)
+        catalog.paths = list(paths)
+        catalog.snapshot = snapshot
+        catalog.files = load_snapshot(snapshot) if snapshot else {}
+        catalog.reload()
+        return catalog
+
+    def reload(self) -> list[str]:
+        """Parse again the lang files changed since they were loaded, and swap their
+        translations in. Unchanged files are only checked with os.stat
+
+        :return: The paths of the new, edited and removed lang files
+        """
+        files = [
+            read_lang_file(path, locale, self.files.get(path))
+            for path, locale in list_lang_files(self.paths)
+        ]
+        paths = {file.path for file in files}
+        # files whose content or modification time changed
+        updated = [file for file in files if self.files.get(file.path) is not file]
+        removed = [path for path in self.files if path not in paths]
+        changed = [
+            file.path for file in updated
+            if (old := self.files.get(file.path)) is None or old.digest != file.digest
+        ] + removed
+        if updated or removed or not self.locales:
+            self.set_files(files)
+        if (updated or removed) and self.snapshot:
+            save_snapshot(self.snapshot, self.files)
+        return changed
+
+    def set_files(self, files: Iterable[LangFile]):
+        "Replace the lang files of the catalog"
+        self.files = {file.path: file for file in files}
+        self._build()
+
+    def _build(self):
+        "Merge the lang files into the locale tables, then replace the previous ones at once"
+        locales: dict[str, dict[str, Any]] = {}
+        for file in self.files.values():
+            locales.setdefault(file.locale, {}).update(file.translations)
+        self.locales, self._resolved = locales, {}
+        self.version += 1
+
+    def table(self, locale: str) -> dict[str, Any]:
+        "Get the translations of a locale, fallback included"
+        if (table := self._resolved.get(locale)) is None:
+            table = dict(self.locales.get(self.fallback, {}))
+            if locale != self.fallback:
+                table.update(self.locales.get(locale, {}))
+            self._resolved[locale] = table
+        return table
+
+    def translate(self, locale: str, key: str, kwargs: dict[str, Any]) -> str:
+        """Translate a key, as python-i18n would do
+        Missing keys give the 'default' argument if any, else the key itself"""
+        template = self.table(locale).get(key)
+        if template is None:
+            return kwargs.get("default", key)
+        if isinstance(template, str):
+            return template
+        return template.render(kwargs)
+
+
+def list_lang_files(paths: Iterable[str]) -> list[tuple[str, str]]:
+    "List the (file path, locale) of the lang files of some folders, in loading order"
+    extension = "." + config.get("file_format")
+    files = []
+    for folder in paths:
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if name.endswith(extension):
+                files.append((os.path.join(folder, name), name[:-len(extension)]))
+    return files
+
+def read_lang_file(path: str, locale: str, cached: Optional[LangFile] = None) -> LangFile:
+    """Compile a lang file, unless the cached version is still up to date
+    A file whose modification time changed but not its content isn't parsed again"""
+    stat = os.stat(path)
+    if cached is not None and (cached.mtime_ns, cached.size) == (stat.st_mtime_ns, stat.st_size):
+        return cached
+    with open(path, "rb") as file:
+        content = file.read()
+    digest = hashlib.sha256(content).hexdigest()
+    if cached is not None and cached.digest == digest:
+        return cached._replace(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+    loader = resource_loader.loaders[os.path.splitext(path)[1][1:]]
+    data = loader.parse_file(content.decode(config.get("encoding")))
+    if not loader.check_data(data, locale):
+        raise I18nFileLoadError(f"error getting data from {path}: {locale} not defined")
+    translations: dict[str, Any] = {}
+    flatten(loader.get_data(data, locale), "", translations)
+    return LangFile(path, locale, stat.st_mtime_ns, stat.st_size, digest, translations)
+
+def flatten(data: dict[str, Any], prefix: str, result: dict[str, Any]):
+    "Flatten nested translations into dotted keys, keeping plural forms together"
+    for key, value in data.items():
+        if isinstance(value, dict) and len(set(PLURALS).intersection(value)) < 2:
+            flatten(value, f"{prefix}{key}.", result)
+        else:
+            result[prefix + key] = compile_template(prefix + key, value)
+
+#==============================================================================
+# Snapshot
+#==============================================================================
+
+def load_snapshot(path: str) -> dict[str, LangFile]:
+    "Read the compiled lang files of a snapshot. An unreadable snapshot is ignored"
+    try:
+        with open(path, "rb") as file:
+            snapshot = pickle.load(file)
+        if snapshot.get("version") == TranslationCatalog.SNAPSHOT_VERSION:
+            return snapshot["files"]
+    except FileNotFoundError:
+        pass
+    except Exception as exception: # pylint: disable=broad-except
+        logger.warning("Ignoring the translations snapshot %s: %r", path, exception)
+    return {}
+
+def save_snapshot(path: str, files: dict[str, LangFile]):
+    "Write the compiled lang files in a snapshot, replacing it at once"
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(temp_path, "wb") as file:
+            pickle.dump(
+                {"version": TranslationCatalog.SNAPSHOT_VERSION, "files": files},
+                file,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(temp_path, path)
+    except OSError as exception:
+        logger.warning("Unable to save the translations snapshot %s: %r", path, exception)
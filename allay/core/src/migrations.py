@@ -0,0 +1,145 @@
+"""
+Ce programme est régi par la licence CeCILL soumise au droit français et
+respectant les principes de diffusion des logiciels libres. Vous pouvez
+utiliser, modifier et/ou redistribuer ce programme sous les conditions
+de la licence CeCILL diffusée sur le site "http://www.cecill.info".
+"""
+
+#==============================================================================
+# Requirements
+#==============================================================================
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+from typing import Iterator, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+#==============================================================================
+# Migrations
+#==============================================================================
+
+# Each module (core, builtin or plugin) can provide:
+# - data/model.sql: the base schema, written to be re-run safely (CREATE ... IF NOT EXISTS)
+# - data/migrations/<version>_<name>.sql: numbered migrations, applied once and in order
+
+MODEL_FILE = "data/model.sql"
+MIGRATIONS_FOLDER = "data/migrations"
+
+_MIGRATION_FILE = re.compile(r"^(\d+)(?:[_-].*)?\.sql$")
+
+SCHEMA_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    module TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    checksum TEXT NOT NULL,
+    applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+class Migration(NamedTuple):
+    "A numbered migration file"
+    version: int
+    path: str
+
+class ModuleSchema(NamedTuple):
+    "The schema files provided by a module"
+    module: str
+    model: str | None
+    migrations: list[Migration]
+    checksum: str
+
+def read_module_schema(module: str, path: str) -> ModuleSchema:
+    "List the schema files of a module and compute their checksum"
+    model = os.path.join(path, MODEL_FILE)
+    if not os.path.isfile(model):
+        model = None
+
+    migrations: list[Migration] = []
+    folder = os.path.join(path, MIGRATIONS_FOLDER)
+    if os.path.isdir(folder):
+        for name in os.listdir(folder):
+            if match := _MIGRATION_FILE.match(name):
+                migrations.append(Migration(int(match.group(1)), os.path.join(folder, name)))
+    migrations.sort()
+    for previous, migration in zip(migrations, migrations[1:]):
+        if previous.version == migration.version:
+            raise ValueError(
+                f"Duplicated migration version {migration.version} in module {module}"
+            )
+
+    checksum = hashlib.sha256()
+    for file in ([model] if model else []) + [migration.path for migration in migrations]:
+        checksum.update(os.path.basename(file).encode())
+        with open(file, "rb") as content:
+            checksum.update(content.read())
+    return ModuleSchema(module, model, migrations, checksum.hexdigest())
+
+def split_script(script: str) -> Iterator[str]:
+    "Split a SQL script in single statements"
+    statement = ""
+    for part in script.split(";"):
+        statement += part + ";"
+        if sqlite3.complete_statement(statement):
+            yield statement.strip()
+            statement = ""
+    if statement.rstrip(";").strip():
+        yield statement.rstrip(";")
+
+def migrate(connection: sqlite3.Connection, modules: list[tuple[str, str]]):
+    """Apply the pending migrations of the given modules in a single transaction
+
+    Modules whose schema files didn't change since the last boot are skipped. When the files of
+    a module changed, its model file is run again and its migrations newer than the recorded
+    version are applied
+
+    :param connection: The database connection
+    :param modules: The modules to migrate, as (module name, module folder) pairs
+    """
+    connection.execute(SCHEMA_MIGRATIONS_TABLE)
+    applied = {
+        module: (version, checksum)
+        for module, version, checksum in connection.execute(
+            "SELECT module, version, checksum FROM schema_migrations"
+        )
+    }
+
+    pending = [
+        schema for schema in (read_module_schema(module, path) for module, path in modules)
+        if (schema.model or schema.migrations)
+        and applied.get(schema.module, (None, None))[1] != schema.checksum
+    ]
+    if not pending:
+        logger.debug("Database schema is up to date")
+        return
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("BEGIN")
+        for schema in pending:
+            version = applied.get(schema.module, (0, None))[0]
+            scripts = [schema.model] if schema.model else []
+            for migration in schema.migrations:
+                if migration.version > version:
+                    scripts.append(migration.path)
+                    version = migration.version
+            for script in scripts:
+                with open(script, "r", encoding="utf-8") as file:
+                    for statement in split_script(file.read()):
+                        cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO schema_migrations (module, version, checksum) VALUES (?, ?, ?)"
+                " ON CONFLICT (module) DO UPDATE SET version = excluded.version,"
+                " checksum = excluded.checksum, applied_at = CURRENT_TIMESTAMP",
+                (schema.module, version, schema.checksum),
+            )
+            logger.info("Database schema of %s migrated to version %d", schema.module, version)
+        connection.commit()
+    except Exception as exception:
+        connection.rollback()
+        raise exception
+    finally:
+        cursor.close()
@@ -0,0 +1,95 @@
+"""
+Ce programme est régi par la licence CeCILL soumise au droit français et
+respectant les principes de diffusion des logiciels libres. Vous pouvez
+utiliser, modifier et/ou redistribuer ce programme sous les conditions
+de la licence CeCILL diffusée sur le site "http://www.cecill.info".
+"""
+
+#==============================================================================
+# Requirements
+#==============================================================================
+
+import threading
+from collections import deque
+from typing import Literal
+
+#==============================================================================
+# Statement statistics
+#==============================================================================
+
+class StatementStats:
+    "Statistics of a normalized SQL statement"
+
+    # Percentiles are computed over the most recent calls only, to keep the memory bounded
+    SAMPLES = 1024
+
+    __slots__ = ("statement", "calls", "total_time", "rows", "latencies")
+
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.calls = 0
+        self.total_time = 0.0
+        self.rows = 0
+        self.latencies: deque[float] = deque(maxlen=StatementStats.SAMPLES)
+
+    def record(self, duration: float, rows: int):
+        "Add a call to the statistics"
+        self.calls += 1
+        self.total_time += duration
+        self.rows += rows
+        self.latencies.append(duration)
+
+    def percentile(self, percent: float) -> float:
+        "Get the latency (in seconds) under which the given percentage of the recent calls ran"
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percent / 100))]
+
+#==============================================================================
+# Query statistics
+#==============================================================================
+
+class QueryStats:
+    "Collect statistics about the queries run on the bot's database"
+
+    enabled = True
+    slow_query_threshold: float = 0.1 # seconds, 0 to disable the slow query log
+
+    _stats: dict[str, StatementStats] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def record(statement: str, duration: float, rows: int):
+        "Record a call of a normalized statement"
+        with QueryStats._lock:
+            if (stats := QueryStats._stats.get(statement)) is None:
+                stats = QueryStats._stats[statement] = StatementStats(statement)
+            stats.record(duration, rows)
+
+    @staticmethod
+    def is_slow(duration: float) -> bool:
+        "Check if a query should be reported in the slow query log"
+        return 0 < QueryStats.slow_query_threshold <= duration
+
+    @staticmethod
+    def top(
+        limit: int = 10,
+        key: Literal["total", "calls", "p99", "rows"] = "total",
+    ) -> list[StatementStats]:
+        "Get the statements that cost the most"
+        sort_keys = {
+            "total": lambda stats: stats.total_time,
+            "calls": lambda stats: stats.calls,
+            "p99": lambda stats: stats.percentile(99),
+            "rows": lambda stats: stats.rows,
+        }
+        with QueryStats._lock:
+            stats = list(QueryStats._stats.values())
+        return sorted(stats, key=sort_keys[key], reverse=True)[:limit]
+
+    @staticmethod
+    def reset():
+        "Forget every collected statistic"
+        with QueryStats._lock:
+            QueryStats._stats.clear()
@@ -0,0 +1,80 @@
+"""
+Ce programme est régi par la licence CeCILL soumise au droit français et
+respectant les principes de diffusion des logiciels libres. Vous pouvez
+utiliser, modifier et/ou redistribuer ce programme sous les conditions
+de la licence CeCILL diffusée sur le site "http://www.cecill.info".
+
+Compare the codecs of the guild configuration files: store and load throughput, and size on
+disk. Codecs whose library isn't installed are skipped
+
+Run from the repository root: python -m benchmarks.config_codecs [guilds]
+"""
+
+#==============================================================================
+# Requirements
+#==============================================================================
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from allay import BotConfig
+
+# the server_config builtin reads the bot config when imported
+BotConfig.load()
+
+# pylint: disable=wrong-import-position
+from allay.builtins.server_config import CODECS, FileConfigStorage
+
+#==============================================================================
+# Benchmark
+#==============================================================================
+
+def synthetic_config(rng: random.Random) -> dict:
+    "Build a guild configuration looking like a real one"
+    def snowflakes(count: int):
+        return [rng.randrange(10**17, 10**19) for _ in range(count)]
+    return {
+        "admins": snowflakes(rng.randint(1, 4)),
+        "mod_roles": snowflakes(rng.randint(0, 6)),
+        "log_channels": snowflakes(rng.randint(0, 3)),
+        "emojis": [rng.choice((":smile:", ":tada:", str(rng.randrange(10**17, 10**19))))],
+        "prefix": rng.choice(("!", "?", "allay ")),
+        "xp_rate": rng.randint(1, 10),
+    }
+
+def folder_size(folder: str) -> int:
+    "Total size of the files of a folder, in bytes"
+    return sum(entry.stat().st_size for entry in os.scandir(folder))
+
+def main():
+    "Run the benchmark and print the results"
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rng = random.Random(0)
+    configs = {guild_id: synthetic_config(rng) for guild_id in range(count)}
+    print(f"{'codec':<8} {'store':>10} {'load':>10} {'size':>10}")
+    for name, codec_class in CODECS.items():
+        try:
+            codec = codec_class()
+        except ImportError:
+            print(f"{name:<8} skipped, library not installed")
+            continue
+        with tempfile.TemporaryDirectory() as folder:
+            storage = FileConfigStorage(folder, codec)
+            start = time.perf_counter()
+            storage.save_many(configs)
+            store_time = time.perf_counter() - start
+            start = time.perf_counter()
+            loaded = storage.load_many(configs.keys())
+            load_time = time.perf_counter() - start
+            assert loaded == configs
+            size = folder_size(folder)
+        print(
+            f"{name:<8} {count / store_time:>8,.0f}/s {count / load_time:>8,.0f}/s"
+            f" {size / 1024:>7,.0f}KiB"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Ce programme est régi par la licence CeCILL soumise au droit français et
+respectant les principes de diffusion des logiciels libres. Vous pouvez
+utiliser, modifier et/ou redistribuer ce programme sous les conditions
+de la licence CeCILL diffusée sur le site "http://www.cecill.info".
+
+Compare the JSON files and sqlite storages of guild configurations
+
+Run from the repository root: python -m benchmarks.config_storage [guilds]
+"""
+
+#==============================================================================
+# Requirements
+#==============================================================================
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from allay import BotConfig, Database
+from allay.core.src.migrations import migrate
+
+# the server_config builtin reads the bot config when imported
+BotConfig.load()
+
+# pylint: disable=wrong-import-position
+from allay.builtins.server_config import JsonConfigStorage, SqliteConfigStorage
+
+#==============================================================================
+# Benchmark
+#==============================================================================
+
+def synthetic_config(guild_id: int) -> dict:
+    "Build a guild configuration looking like a real one"
+    rng = random.Random(guild_id)
+    return {
+        "admins": [rng.getrandbits(60) for _ in range(rng.randint(0, 3))],
+        "welcome_channel": [rng.getrandbits(60)],
+        "welcome_message": "Welcome {user} on {server}!" * rng.randint(1, 3),
+        "xp_rate": rng.randint(1, 10),
+        "levelup_emojis": ["tada", "star"],
+    }
+
+def timed(name: str, function, *args):
+    "Run a function and print its duration"
+    start = time.perf_counter()
+    result = function(*args)
+    print(f"  {name:<28} {time.perf_counter() - start:8.3f}s")
+    return result
+
+def folder_size(folder: str) -> int:
+    "Get the size of the files of a folder"
+    return sum(entry.stat().st_size for entry in os.scandir(folder))
+
+def bench(name: str, storage, configs: dict[int, dict], save_all):
+    "Run the same operations on a storage"
+    guild_ids = list(configs)
+    print(name)
+    timed("save all", save_all, configs)
+    timed("load one by one", lambda: [storage.load(guild_id) for guild_id in guild_ids])
+    timed("load_many", storage.load_many, guild_ids)
+    timed("set_option x1000", lambda: [
+        storage.set_option(guild_id, "xp_rate", 5) for guild_id in guild_ids[:1000]
+    ])
+    timed("guild_ids", storage.guild_ids)
+
+def main():
+    "Run the benchmark and print the results"
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    configs = {guild_id: synthetic_config(guild_id) for guild_id in range(1, count + 1)}
+    with tempfile.TemporaryDirectory() as folder:
+        json_storage = JsonConfigStorage(os.path.join(folder, "configs"))
+        bench(f"json ({count} guilds)", json_storage, configs,
+              lambda configs: [json_storage.save(k, v) for k, v in configs.items()])
+        print(f"  {count} files, {folder_size(json_storage.folder) / 1024:.0f} KiB")
+
+        Database.database = sqlite3.connect(
+            os.path.join(folder, "database.db"), check_same_thread=False
+        )
+        migrate(Database.database, [("builtins.server_config", "allay/builtins/server_config")])
+        sqlite_storage = SqliteConfigStorage()
+        bench(f"sqlite ({count} guilds)", sqlite_storage, configs, sqlite_storage.save_many)
+        Database.database.close()
+        print(f"  1 file, {os.path.getsize(os.path.join(folder, 'database.db')) / 1024:.0f} KiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Ce programme est régi par la licence CeCILL soumise au droit français et
+respectant les principes de diffusion des logiciels libres. Vous pouvez
+utiliser, modifier et/ou redistribuer ce programme sous les conditions
+de la licence CeCILL diffusée sur le site "http://www.cecill.info".
+
+Compare inserting rows one by one with `Database.query` against `Database.query_many`
+
+Run from the repository root: python -m benchmarks.database_bulk [rows]
+"""
+
+#==============================================================================
+# Requirements
+#==============================================================================
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from allay import Database
+
+#==============================================================================
+# Benchmark
+#==============================================================================
+
+def use_database(path: str):
+    "Point the Database class to a fresh database file"
+    Database.database = sqlite3.connect(path, check_same_thread=False)
+    Database.query("CREATE TABLE stats (guild_id INTEGER, user_id INTEGER, value INTEGER)")
+
+def bench_query(rows: list[tuple]):
+    "Insert the rows one by one"
+    for row in rows:
+        Database.query("INSERT INTO stats VALUES (?, ?, ?)", row)
+
+def bench_query_many(rows: list[tuple]):
+    "Insert the rows in bulk"
+    Database.query_many("INSERT INTO stats VALUES (?, ?, ?)", rows)
+
+def main():
+    "Run the benchmark and print the results"
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rows = [(i % 100, i, i * 2) for i in range(count)]
+    with tempfile.TemporaryDirectory() as folder:
+        results = {}
+        for name, bench in (("query", bench_query), ("query_many", bench_query_many)):
+            use_database(os.path.join(folder, f"{name}.db"))
+            start = time.perf_counter()
+            bench(rows)
+            results[name] = time.perf_counter() - start
+            Database.database.close()
+    for name, duration in results.items():
+        print(f"{name:<12} {count} rows in {duration:.3f}s ({count / duration:,.0f} rows/s)")
+    print(f"speedup      x{results['query'] / results['query_many']:.1f}")
+
+if __name__ == "__main__":
+    main()
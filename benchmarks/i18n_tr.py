@@ -0,0 +1,49 @@
+"""
+Ce programme est régi par la licence CeCILL soumise au droit français et
+respectant les principes de diffusion des logiciels libres. Vous pouvez
+utiliser, modifier et/ou redistribuer ce programme sous les conditions
+de la licence CeCILL diffusée sur le site "http://www.cecill.info".
+
+Compare translating with python-i18n's `i18n.t` against the precompiled I18N catalog
+
+Run from the repository root: python -m benchmarks.i18n_tr
+"""
+
+#==============================================================================
+# Requirements
+#==============================================================================
+
+import timeit
+from functools import partial
+
+import i18n
+
+from allay.core.src.i18n import catalog
+
+#==============================================================================
+# Benchmark
+#==============================================================================
+
+CASES = [
+    # (description, locale, key, arguments)
+    ("static", "fr", "sconfig.option-notfound", {}),
+    ("placeholder", "fr", "sconfig.option-edited", {"opt": "prefix"}),
+    ("fallback", "en-US", "sconfig.option-edited", {"opt": "prefix"}),
+    ("plural", "en", "logs.emoji_update.removed", {"count": 3}),
+]
+
+def main():
+    "Run the benchmark and print the results"
+    number = 50_000
+    print(f"{'case':<12} {'i18n.t':>10} {'catalog':>10} {'speedup':>8}")
+    for name, locale, key, kwargs in CASES:
+        assert i18n.t(key, locale=locale, **kwargs) == catalog.translate(locale, key, kwargs)
+        legacy = timeit.timeit(partial(i18n.t, key, locale=locale, **kwargs), number=number)
+        compiled = timeit.timeit(partial(catalog.translate, locale, key, kwargs), number=number)
+        print(
+            f"{name:<12} {legacy / number * 1e9:>8.0f}ns {compiled / number * 1e9:>8.0f}ns"
+            f" {legacy / compiled:>7.1f}x"
+        )
+
+if __name__ == "__main__":
+    main()
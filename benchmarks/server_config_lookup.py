@@ -0,0 +1,61 @@
+"""
+Ce programme est régi par la licence CeCILL soumise au droit français et
+respectant les principes de diffusion des logiciels libres. Vous pouvez
+utiliser, modifier et/ou redistribuer ce programme sous les conditions
+de la licence CeCILL diffusée sur le site "http://www.cecill.info".
+
+Measure the cost of reading an option through `bot.server_configs[guild_id]`, compared with
+the previous implementation that copied the template into a new dict on every lookup
+
+Run from the repository root: python -m benchmarks.server_config_lookup
+"""
+
+#==============================================================================
+# Requirements
+#==============================================================================
+
+import os
+import tempfile
+import timeit
+
+from allay import BotConfig
+
+# the server_config builtin reads the bot config when imported
+BotConfig.load()
+
+# pylint: disable=wrong-import-position
+from allay.builtins.server_config import (
+    CONFIG_TEMPLATE, ConfigManager, JsonConfigStorage, register_options
+)
+
+#==============================================================================
+# Benchmark
+#==============================================================================
+
+def legacy_lookup(manager: ConfigManager, guild_id: int):
+    "Previous lookup: template copy, merge, filter and wrap in a new dict"
+    result = dict(CONFIG_TEMPLATE)
+    result.update(manager.cache.get(guild_id)) # type: ignore
+    allowed_keys = CONFIG_TEMPLATE.keys()
+    return dict({k: v for k, v in result.items() if k in allowed_keys})
+
+def main():
+    "Run the benchmark and print the results"
+    # plugins usually register a few dozens of options
+    register_options({
+        f"option_{i}": {"default": i, "type": "int", "command": None} for i in range(30)
+    })
+    with tempfile.TemporaryDirectory() as folder:
+        manager = ConfigManager(JsonConfigStorage(os.path.join(folder, "configs")))
+        manager[1] = {"admins": [1, 2, 3]}
+        number = 200_000
+        results = {
+            "legacy": timeit.timeit(lambda: legacy_lookup(manager, 1)["admins"], number=number),
+            "view": timeit.timeit(lambda: manager[1]["admins"], number=number),
+        }
+    for name, duration in results.items():
+        print(f"{name:<8} {duration / number * 1e9:8.0f} ns per lookup")
+    print(f"speedup  x{results['legacy'] / results['view']:.1f}")
+
+if __name__ == "__main__":
+    main()